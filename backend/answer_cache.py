@@ -0,0 +1,157 @@
+from collections import Counter
+from typing import Any, Dict, FrozenSet, Optional, Set, Tuple
+import os
+import re
+
+from cache import TTLCache
+
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "5000"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.85"))
+ANSWER_CACHE_CONTEXT_TYPES = {
+    t.strip() for t in os.getenv("ANSWER_CACHE_CONTEXT_TYPES", "summary").split(",") if t.strip()
+}
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+_SPACES = re.compile(r"\s+")
+# Words that do not change what is asked; negations ("not", "no", "never", the "t" of "isn't") are never dropped
+_FILLER_WORDS = frozenset(
+    "a an the is are was were be been being of to in on at for by with and or as it its this that these those "
+    "me my i you your we us our please tell explain can could would will do does did".split()
+)
+
+def normalize_question(text: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace"""
+    return _SPACES.sub(" ", _NON_WORD.sub(" ", text.lower())).strip()
+
+def content_words(text: str) -> FrozenSet[str]:
+    """Words of a normalised question that carry its meaning"""
+    return frozenset(word for word in text.split() if word not in _FILLER_WORDS)
+
+def char_ngrams(text: str, n: int = 3) -> Set[str]:
+    """Character n-grams of each word, padded so short words still match"""
+    grams = set()
+    for word in text.split():
+        padded = f" {word} "
+        grams.update(padded[i:i + n] for i in range(max(len(padded) - n + 1, 1)))
+    return grams
+
+class AnswerCache:
+    """Tutor answers keyed by normalised question, subject, topic and context type; near-duplicates match by n-gram similarity"""
+
+    def __init__(
+        self,
+        maxsize: int = ANSWER_CACHE_SIZE,
+        ttl: float = ANSWER_CACHE_TTL_SECONDS,
+        similarity: float = ANSWER_CACHE_SIMILARITY,
+        context_types: Set[str] = ANSWER_CACHE_CONTEXT_TYPES
+    ):
+        self.similarity = similarity
+        self.context_types = context_types
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self._answers = TTLCache(maxsize=maxsize, ttl=ttl, on_evict=self._unindex)
+        self._grams: Dict[Tuple, Set[str]] = {}
+        self._words: Dict[Tuple, FrozenSet[str]] = {}
+        self._postings: Dict[Tuple, Dict[str, Set[Tuple]]] = {}
+
+    def is_cacheable(self, context_type: Optional[str]) -> bool:
+        return context_type in self.context_types
+
+    @staticmethod
+    def _scope(subject: Optional[str], topic: Optional[str], context_type: Optional[str]) -> Tuple:
+        return ((subject or "").lower(), (topic or "").lower(), context_type or "")
+
+    def lookup(self, message: str, subject: Optional[str], topic: Optional[str], context_type: Optional[str]) -> Optional[str]:
+        """Return a cached answer for the same or a near-identical question"""
+        scope = self._scope(subject, topic, context_type)
+        question = normalize_question(message)
+        answer = self._answers.get((scope, question))
+        if answer is not None:
+            self.exact_hits += 1
+            return answer
+
+        key = self._closest((scope, question))
+        if key is not None:
+            answer = self._answers.get(key)
+            if answer is not None:
+                self.similar_hits += 1
+                return answer
+
+        self.misses += 1
+        return None
+
+    def _closest(self, key: Tuple) -> Optional[Tuple]:
+        scope, question = key
+        postings = self._postings.get(scope)
+        if not postings:
+            return None
+        grams = char_ngrams(question)
+        words = content_words(question)
+        shared = Counter()
+        for gram in grams:
+            shared.update(postings.get(gram, ()))
+
+        best_key, best_score = None, self.similarity
+        for candidate, overlap in shared.items():
+            score = overlap / (len(grams) + len(self._grams[candidate]) - overlap)
+            # Jaccard over n-grams, plus the same content words so "why does ice not float" never matches "why does ice float"
+            if score >= best_score and self._words[candidate] == words:
+                best_key, best_score = candidate, score
+        return best_key
+
+    def store(self, message: str, subject: Optional[str], topic: Optional[str], context_type: Optional[str], answer: str):
+        scope = self._scope(subject, topic, context_type)
+        key = (scope, normalize_question(message))
+        if key not in self._grams:
+            grams = char_ngrams(key[1])
+            self._grams[key] = grams
+            self._words[key] = content_words(key[1])
+            postings = self._postings.setdefault(scope, {})
+            for gram in grams:
+                postings.setdefault(gram, set()).add(key)
+        self._answers.set(key, answer)
+
+    def _unindex(self, key: Tuple, _answer: Any = None):
+        grams = self._grams.pop(key, None)
+        if grams is None:
+            return
+        del self._words[key]
+        postings = self._postings.get(key[0], {})
+        for gram in grams:
+            keys = postings.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del postings[gram]
+        if not postings:
+            self._postings.pop(key[0], None)
+
+    def invalidate(self, subject: Optional[str] = None, topic: Optional[str] = None) -> int:
+        """Drop cached answers, optionally only those for a subject and/or topic"""
+        subject = subject.lower() if subject else None
+        topic = topic.lower() if topic else None
+        removed = 0
+        for key in self._answers.keys():
+            scope_subject, scope_topic, _ = key[0]
+            if (subject is None or scope_subject == subject) and (topic is None or scope_topic == topic):
+                self._answers.invalidate(key)
+                self._unindex(key)
+                removed += 1
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.exact_hits + self.similar_hits
+        lookups = hits + self.misses
+        return {
+            "entries": len(self._answers),
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "upstream_calls_saved": hits,
+            "evictions": self._answers.evictions
+        }
+
+answer_cache = AnswerCache()
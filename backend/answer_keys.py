@@ -0,0 +1,84 @@
+from typing import Any, Dict, Iterable, Optional
+import os
+import sys
+
+import numpy as np
+
+from cache import TTLCache
+from database import quizzes_collection
+
+ANSWER_KEY_CACHE_SIZE = int(os.getenv("ANSWER_KEY_CACHE_SIZE", "20000"))
+
+ANSWER_KEY_PROJECTION = {
+    "_id": 0, "id": 1, "stream": 1, "class_level": 1, "subject": 1, "topic": 1, "questions.correct_answer": 1
+}
+
+class AnswerKey:
+    """Packed correct-option indices of a quiz plus the metadata needed to record progress"""
+
+    __slots__ = ("quiz_id", "answers", "stream", "class_level", "subject", "topic")
+
+    def __init__(self, quiz_doc: Dict[str, Any]):
+        self.quiz_id = quiz_doc["id"]
+        self.answers = np.array(
+            [q["correct_answer"] for q in quiz_doc.get("questions", [])], dtype=np.int8
+        )
+        self.stream = quiz_doc["stream"]
+        self.class_level = quiz_doc["class_level"]
+        self.subject = quiz_doc["subject"]
+        self.topic = quiz_doc["topic"]
+
+    @property
+    def question_count(self) -> int:
+        return len(self.answers)
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            sys.getsizeof(self)
+            + self.answers.nbytes
+            + sum(sys.getsizeof(value) for value in (self.quiz_id, self.stream, self.subject, self.topic))
+        )
+
+class AnswerKeyCache:
+    """LRU cache of quiz answer keys so grading never loads full quiz bodies"""
+
+    def __init__(self, maxsize: int = ANSWER_KEY_CACHE_SIZE):
+        self._keys = TTLCache(maxsize=maxsize)
+        self.loads = 0
+
+    async def get(self, quiz_id: str) -> Optional[AnswerKey]:
+        return (await self.get_many([quiz_id])).get(quiz_id)
+
+    async def get_many(self, quiz_ids: Iterable[str]) -> Dict[str, AnswerKey]:
+        """Answer keys for the given quizzes, loading any misses with one $in query"""
+        found, missing = {}, []
+        for quiz_id in set(quiz_ids):
+            key = self._keys.get(quiz_id)
+            if key is None:
+                missing.append(quiz_id)
+            else:
+                found[quiz_id] = key
+
+        if missing:
+            self.loads += 1
+            async for doc in quizzes_collection.find({"id": {"$in": missing}}, ANSWER_KEY_PROJECTION):
+                key = AnswerKey(doc)
+                self._keys.set(key.quiz_id, key)
+                found[key.quiz_id] = key
+        return found
+
+    def invalidate(self, quiz_id: str):
+        self._keys.invalidate(quiz_id)
+
+    def clear(self):
+        self._keys.clear()
+
+    def memory_bytes(self) -> int:
+        """Approximate memory held by cached answer keys"""
+        return sum(key.nbytes for key in self._keys.values())
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._keys.stats(), "db_loads": self.loads, "memory_bytes": self.memory_bytes()}
+
+answer_keys = AnswerKeyCache()
@@ -1,13 +1,32 @@
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextvars
 import os
 from dotenv import load_dotenv
 
+from metrics import timed_call
+
 load_dotenv()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes made with a different cost are flagged by verify_and_update so they get rehashed on login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS
+)
+
+# bcrypt releases the GIL, so a small thread pool keeps hashing off the event loop
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+_hash_executor: Optional[ThreadPoolExecutor] = None
+_hash_slots: Optional[asyncio.Semaphore] = None
 
 JWT_SECRET = os.getenv("JWT_SECRET", "your-secret-key-change-in-production-2024")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
@@ -21,6 +40,43 @@ def get_password_hash(password: str) -> str:
     """Hash a password"""
     return pwd_context.hash(password)
 
+def _get_hash_slots() -> asyncio.Semaphore:
+    global _hash_slots
+    if _hash_slots is None:
+        _hash_slots = asyncio.Semaphore(PASSWORD_HASH_MAX_PENDING)
+    return _hash_slots
+
+def _get_hash_executor() -> ThreadPoolExecutor:
+    global _hash_executor
+    if _hash_executor is None:
+        _hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+    return _hash_executor
+
+async def _run_in_hash_pool(operation: str, func, *args):
+    async with _get_hash_slots():
+        loop = asyncio.get_running_loop()
+        # Run in a copy of the caller's context so the time is attributed to its request
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            _get_hash_executor(), context.run, timed_call, "bcrypt", operation, func, *args
+        )
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password in the hash pool; returns (valid, new_hash) where new_hash is set when the cost changed"""
+    return await _run_in_hash_pool("verify", pwd_context.verify_and_update, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password in the hash pool"""
+    return await _run_in_hash_pool("hash", pwd_context.hash, password)
+
+def shutdown_hash_pool():
+    """Stop the hash threads; the next hash starts a fresh pool (and semaphore, for a new event loop)"""
+    global _hash_executor, _hash_slots
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False)
+    _hash_executor = None
+    _hash_slots = None
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
     to_encode = data.copy()
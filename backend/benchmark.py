@@ -0,0 +1,393 @@
+"""
+HTTP benchmark for the FastAPI backend (throughput and p50/p95/p99 latency per endpoint)
+Run: python benchmark.py [--uvicorn | --base-url URL] [--output run.json] [--baseline previous.json]
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import httpx
+
+SCENARIOS = ["login", "catalogue_list", "catalogue_revisit", "catalogue_search", "quiz_submit", "chat", "dashboard", "metadata"]
+
+SUBJECTS = {
+    "Physics": ["Light", "Motion", "Electricity", "Magnetism"],
+    "Chemistry": ["Acids", "Metals", "Carbon", "Periodic Table"],
+    "Biology": ["Cells", "Genetics", "Ecology", "Evolution"],
+    "Mathematics": ["Algebra", "Geometry", "Calculus", "Statistics"],
+}
+WORDS = ["introduction", "advanced", "concepts", "guide", "fundamentals", "practice", "revision", "theory", "applied"]
+PASSWORD = "benchmark-password"
+BENCHMARK_DB_NAME = "ai_tutor_benchmark"
+
+class StubLlmTransport:
+    """LLM transport stand-in answering after a fixed delay"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def complete(self, prompt, text: str) -> str:
+        await asyncio.sleep(self.latency)
+        return f"Here is an explanation of: {text}"
+
+    async def stream(self, prompt, text: str):
+        yield await self.complete(prompt, text)
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of pre-sorted values"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+def summarize(latencies: List[float], errors: int, elapsed: float, received: int = 0) -> Dict[str, Any]:
+    values = sorted(latencies)
+    count = len(values)
+    return {
+        "requests": count,
+        "errors": errors,
+        "kb_per_request": round(received / count / 1024, 3) if count else 0.0,
+        "throughput_rps": round(count / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(sum(values) / count * 1000, 3) if count else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if count else 0.0,
+    }
+
+async def run_load(
+    request: Callable[[int], Awaitable[httpx.Response]],
+    total: int,
+    concurrency: int,
+    warmup: int
+) -> Dict[str, Any]:
+    """Issue `total` requests from `concurrency` workers and summarise their latencies"""
+    for i in range(warmup):
+        await request(-1 - i)
+
+    latencies: List[float] = []
+    errors = 0
+    # Bytes on the wire, i.e. after response compression
+    received = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors, received
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                response = await request(i)
+                ok = response.status_code < 400
+                received += response.num_bytes_downloaded
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started, received)
+
+class Fixture:
+    """Users, catalogue and quizzes created through the API before measuring"""
+
+    def __init__(
+        self, client: httpx.AsyncClient, rng: random.Random, credentials: Optional[Dict[str, Tuple[str, str]]] = None
+    ):
+        self.client = client
+        self.rng = rng
+        self.tokens: Dict[str, str] = {}
+        self.quiz_ids: List[str] = []
+        self.search_terms: List[str] = []
+        # (email, password) per role; given for remote runs, which log in to existing accounts instead of registering
+        self.existing_accounts = credentials is not None
+        self.credentials = credentials or {
+            "admin": ("bench-admin@example.com", PASSWORD),
+            "student": ("bench-student@example.com", PASSWORD),
+        }
+
+    def auth(self, role: str) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.tokens[role]}"}
+
+    async def login(self, role: str) -> httpx.Response:
+        email, password = self.credentials[role]
+        return await self.client.post("/api/auth/login", json={"email": email, "password": password})
+
+    async def user(self, role: str):
+        if not self.existing_accounts:
+            email, password = self.credentials[role]
+            await self.client.post("/api/auth/register", json={
+                "email": email, "password": password, "full_name": f"Benchmark {role}", "role": role
+            })
+        response = await self.login(role)
+        response.raise_for_status()
+        self.tokens[role] = response.json()["access_token"]
+
+    async def setup(self, books: int, quizzes: int):
+        await self.user("admin")
+        await self.user("student")
+
+        rows = []
+        for i in range(books):
+            subject = self.rng.choice(list(SUBJECTS))
+            title = " ".join(self.rng.sample(WORDS, 3)).title()
+            rows.append(json.dumps({
+                "title": f"{title} {i}", "author": f"Author {i % 50}", "stream": "CBSE",
+                "class_level": self.rng.randint(6, 12), "subject": subject,
+                "topic": self.rng.choice(SUBJECTS[subject]), "tags": self.rng.sample(WORDS, 2)
+            }))
+        response = await self.client.post(
+            "/api/books/bulk", content="\n".join(rows),
+            headers={**self.auth("admin"), "Content-Type": "application/x-ndjson"}
+        )
+        response.raise_for_status()
+        self.search_terms = WORDS + [word[:4] for word in WORDS]
+
+        for i in range(quizzes):
+            subject = list(SUBJECTS)[i % len(SUBJECTS)]
+            response = await self.client.post("/api/quizzes", headers=self.auth("admin"), json={
+                "title": f"Quiz {i}", "stream": "CBSE", "class_level": 10, "subject": subject,
+                "topic": SUBJECTS[subject][i % 4], "difficulty": "intermediate",
+                "questions": [
+                    {"question": f"Q{q}", "options": ["A", "B", "C", "D"], "correct_answer": q % 4, "explanation": "-"}
+                    for q in range(10)
+                ]
+            })
+            response.raise_for_status()
+            self.quiz_ids.append(response.json()["id"])
+
+def scenario_requests(fixture: Fixture) -> Dict[str, Callable[[int], Awaitable[httpx.Response]]]:
+    client, rng = fixture.client, fixture.rng
+    student = fixture.auth("student")
+
+    async def login(i: int):
+        return await fixture.login("student")
+
+    async def catalogue_list(i: int):
+        subject = rng.choice([None, *SUBJECTS])
+        params = {"limit": 20, "compact": "true", **({"subject": subject} if subject else {})}
+        return await client.get("/api/books", params=params)
+
+    # A client navigating back to listings it has seen, revalidating with the ETag it cached
+    etags: Dict[str, str] = {}
+
+    async def catalogue_revisit(i: int):
+        subject = rng.choice([None, *SUBJECTS])
+        params = {"limit": 20, "compact": "true", **({"subject": subject} if subject else {})}
+        key = str(subject)
+        response = await client.get("/api/books", params=params, headers={"If-None-Match": etags[key]} if key in etags else {})
+        if "etag" in response.headers:
+            etags[key] = response.headers["etag"]
+        return response
+
+    async def catalogue_search(i: int):
+        return await client.get("/api/books", params={"search": rng.choice(fixture.search_terms), "limit": 20})
+
+    async def quiz_submit(i: int):
+        answers = [rng.randrange(4) for _ in range(10)]
+        return await client.post(f"/api/quizzes/{rng.choice(fixture.quiz_ids)}/attempt", headers=student, json=answers)
+
+    async def chat(i: int):
+        return await client.post("/api/chat", headers=student, json={
+            "message": f"Can you explain question {i} about {rng.choice(WORDS)}?",
+            "subject": "Physics", "context_type": "doubt"
+        })
+
+    async def dashboard(i: int):
+        return await client.get("/api/dashboard/stats", headers=student)
+
+    async def metadata(i: int):
+        return await client.get("/api/metadata/subjects", params={"stream": "CBSE"})
+
+    return {
+        "login": login, "catalogue_list": catalogue_list, "catalogue_revisit": catalogue_revisit,
+        "catalogue_search": catalogue_search,
+        "quiz_submit": quiz_submit, "chat": chat, "dashboard": dashboard, "metadata": metadata,
+    }
+
+async def attempt_totals(fixture: Fixture):
+    """Quiz attempts recorded for the benchmark student as (topic progress sum, dashboard total)"""
+    response = await fixture.client.get("/api/progress", params={"limit": 500}, headers=fixture.auth("student"))
+    progress_attempts = sum(item["quiz_attempts"] for item in response.json())
+    response = await fixture.client.get("/api/dashboard/stats", headers=fixture.auth("student"))
+    return progress_attempts, response.json()["total_quizzes_completed"]
+
+async def check_consistency(fixture: Fixture, before: tuple, submitted: int) -> Dict[str, Any]:
+    """Concurrent quiz submissions must all be reflected in progress and dashboard totals"""
+    progress_attempts, dashboard_attempts = await attempt_totals(fixture)
+    progress_attempts -= before[0]
+    dashboard_attempts -= before[1]
+    return {
+        "submitted": submitted,
+        "progress_quiz_attempts": progress_attempts,
+        "dashboard_quiz_attempts": dashboard_attempts,
+        "ok": progress_attempts == dashboard_attempts == submitted,
+    }
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Scenarios whose p95 latency or throughput regressed beyond the tolerance"""
+    regressions = []
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        if previous["p95_ms"] and current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+        if previous["throughput_rps"] and current["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {previous['throughput_rps']} -> {current['throughput_rps']} req/s")
+    return regressions
+
+async def benchmark(client: httpx.AsyncClient, args: argparse.Namespace) -> Dict[str, Any]:
+    credentials = None
+    if args.base_url:
+        credentials = {"admin": (args.admin_email, args.admin_password), "student": (args.student_email, args.student_password)}
+    fixture = Fixture(client, random.Random(args.seed), credentials)
+    await fixture.setup(args.books, args.quizzes)
+    requests = scenario_requests(fixture)
+
+    results: Dict[str, Any] = {}
+    report: Dict[str, Any] = {"scenarios": results}
+    for name in args.scenarios:
+        if name == "quiz_submit":
+            before = await attempt_totals(fixture)
+        results[name] = await run_load(requests[name], args.requests, args.concurrency, args.warmup)
+        if name == "quiz_submit":
+            submitted = results[name]["requests"] - results[name]["errors"] + args.warmup
+            report["consistency"] = await check_consistency(fixture, before, submitted)
+        print(
+            f"{name:<18} {results[name]['throughput_rps']:>9} req/s  "
+            f"p50 {results[name]['p50_ms']:>8}ms  p95 {results[name]['p95_ms']:>8}ms  "
+            f"p99 {results[name]['p99_ms']:>8}ms  {results[name]['kb_per_request']:>8}KB/req  errors {results[name]['errors']}"
+        )
+    return report
+
+async def run_in_process(args: argparse.Namespace) -> Dict[str, Any]:
+    import server
+    from tutor_llm import llm_pool
+
+    llm_pool.transport_factory = lambda api_key, model, system_message: StubLlmTransport(args.llm_latency_ms / 1000)
+    async with server.app.router.lifespan_context(server.app):
+        if args.uvicorn:
+            import uvicorn
+
+            config = uvicorn.Config(server.app, host="127.0.0.1", port=args.port, log_level="warning", access_log=False, lifespan="off")
+            uvicorn_server = uvicorn.Server(config)
+            serving = asyncio.create_task(uvicorn_server.serve())
+            while not uvicorn_server.started:
+                await asyncio.sleep(0.05)
+            try:
+                async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=args.timeout) as client:
+                    return await benchmark(client, args)
+            finally:
+                uvicorn_server.should_exit = True
+                await serving
+
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=args.timeout) as client:
+            return await benchmark(client, args)
+
+async def main(args: argparse.Namespace) -> int:
+    if args.base_url:
+        async with httpx.AsyncClient(base_url=args.base_url.rstrip("/"), timeout=args.timeout) as client:
+            report = await benchmark(client, args)
+        mode = "remote"
+    else:
+        report = await run_in_process(args)
+        mode = "uvicorn" if args.uvicorn else "asgi"
+
+    results = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "mode": mode,
+        "storage": os.environ.get("STORAGE_BACKEND", "mongo"),
+        "config": {
+            key: getattr(args, key) for key in
+            ("requests", "concurrency", "warmup", "books", "quizzes", "llm_latency_ms", "seed")
+        },
+        **report,
+    }
+    status = 0
+    consistency = results.get("consistency")
+    if consistency and not consistency["ok"]:
+        print(f"Consistency check failed: {consistency}")
+        status = 1
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            status = 1
+    return status
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the AI Tutor API")
+    parser.add_argument("--base-url", help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--uvicorn", action="store_true", help="Serve the in-process app through uvicorn")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--storage", choices=["memory", "mongo"], default="memory", help="Backend for in-process runs")
+    parser.add_argument("--db-name", default=BENCHMARK_DB_NAME, help="MongoDB database for in-process --storage mongo runs")
+    parser.add_argument("--admin-email", help="Existing admin account for --base-url runs")
+    parser.add_argument("--admin-password", default=os.environ.get("BENCHMARK_ADMIN_PASSWORD"))
+    parser.add_argument("--student-email", help="Existing student account for --base-url runs")
+    parser.add_argument("--student-password", default=os.environ.get("BENCHMARK_STUDENT_PASSWORD"))
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--requests", type=int, default=500, help="Measured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--books", type=int, default=2000)
+    parser.add_argument("--quizzes", type=int, default=40)
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="Write JSON results to this path")
+    parser.add_argument("--baseline", help="Compare against a previous JSON result and fail on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    args = parser.parse_args(argv)
+    if args.base_url:
+        # Remote runs never create accounts on the target server
+        missing = [name for name in ("admin_email", "admin_password", "student_email", "student_password") if not getattr(args, name)]
+        if missing:
+            parser.error("--base-url needs existing accounts: " + ", ".join("--" + name.replace("_", "-") for name in missing))
+    elif args.storage == "mongo":
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        if args.db_name == os.environ.get("DB_NAME", "ai_tutor"):
+            parser.error(f"--db-name {args.db_name} is the application database; benchmark data would be visible to users")
+    return args
+
+if __name__ == "__main__":
+    args = parse_args()
+    # A log line per request would be measured along with the requests
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
+    if not args.base_url:
+        # Must be set before the database module creates its client
+        os.environ["STORAGE_BACKEND"] = args.storage
+        os.environ["DB_NAME"] = args.db_name
+    sys.exit(asyncio.run(main(args)))
@@ -0,0 +1,181 @@
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+import codecs
+import json
+import os
+import time
+
+from pymongo.errors import BulkWriteError
+
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "1000"))
+BULK_MAX_RECORD_BYTES = int(os.getenv("BULK_MAX_RECORD_BYTES", str(1024 * 1024)))
+BULK_MAX_REPORTED_ERRORS = 1000
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines")
+_ELEMENT_END = frozenset(" \t\n\r,]")  # what can follow a complete array element
+
+class MalformedPayload(ValueError):
+    pass
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[Any, Optional[str]]]:
+    """Yield (record, error) per non-empty line of an NDJSON stream"""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _parse_line(line)
+        if len(buffer) > BULK_MAX_RECORD_BYTES:
+            raise MalformedPayload("Record exceeds maximum size")
+    if buffer.strip():
+        yield _parse_line(buffer)
+
+def _parse_line(line: bytes) -> Tuple[Any, Optional[str]]:
+    try:
+        return json.loads(line), None
+    except ValueError as e:
+        return None, f"Invalid JSON: {str(e)}"
+
+class _JsonArrayParser:
+    """Incremental decoder for the elements of a top-level JSON array"""
+
+    def __init__(self):
+        self.decoder = json.JSONDecoder()
+        self.utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.pos = 0
+        self.started = False
+        self.expect_comma = False
+        self.finished = False
+
+    def feed(self, chunk: bytes, eof: bool = False) -> List[Any]:
+        """Add raw bytes and return the records completed so far"""
+        self.buffer = self.buffer[self.pos:] + self.utf8.decode(chunk, final=eof)
+        self.pos = 0
+        records = []
+        buffer = self.buffer
+        while not self.finished:
+            while self.pos < len(buffer) and buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos >= len(buffer):
+                break
+            char = buffer[self.pos]
+            if not self.started:
+                if char != "[":
+                    raise MalformedPayload("Expected a JSON array or NDJSON")
+                self.started = True
+                self.pos += 1
+            elif char == "]":
+                self.finished = True
+                self.pos += 1
+            elif self.expect_comma:
+                if char != ",":
+                    raise MalformedPayload(f"Expected ',' at offset {self.pos}")
+                self.expect_comma = False
+                self.pos += 1
+            else:
+                try:
+                    record, end = self.decoder.raw_decode(buffer, self.pos)
+                except json.JSONDecodeError as e:
+                    if eof:
+                        raise MalformedPayload(f"Invalid JSON: {str(e)}")
+                    if len(buffer) - self.pos > BULK_MAX_RECORD_BYTES:
+                        raise MalformedPayload("Record exceeds maximum size")
+                    break
+                if not eof and (end == len(buffer) or buffer[end] not in _ELEMENT_END):
+                    # A number cut at the chunk boundary decodes as its prefix ("1." of "1.5e3"); wait for the rest
+                    if len(buffer) - self.pos > BULK_MAX_RECORD_BYTES:
+                        raise MalformedPayload("Record exceeds maximum size")
+                    break
+                self.pos = end
+                self.expect_comma = True
+                records.append(record)
+        if eof and not self.finished:
+            raise MalformedPayload("Unterminated JSON array")
+        return records
+
+async def iter_json_array(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[Any, Optional[str]]]:
+    """Yield (record, None) for each element of a streamed JSON array"""
+    parser = _JsonArrayParser()
+    async for chunk in chunks:
+        for record in parser.feed(chunk):
+            yield record, None
+    for record in parser.feed(b"", eof=True):
+        yield record, None
+
+def iter_records(chunks: AsyncIterator[bytes], content_type: Optional[str]) -> AsyncIterator[Tuple[Any, Optional[str]]]:
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in NDJSON_TYPES:
+        return iter_ndjson(chunks)
+    return iter_json_array(chunks)
+
+async def bulk_import(
+    chunks: AsyncIterator[bytes],
+    content_type: Optional[str],
+    build_doc: Callable[[Dict[str, Any]], Dict[str, Any]],
+    collection,
+    on_inserted: Optional[Callable[[List[Dict[str, Any]]], Awaitable[None]]] = None
+) -> Dict[str, Any]:
+    """Validate (build_doc raises ValueError for bad rows) and insert streamed records in chunks with unordered insert_many"""
+    started = time.perf_counter()
+    received = inserted = failed = 0
+    errors: List[Dict[str, Any]] = []
+
+    def reject(row: int, error: str):
+        nonlocal failed
+        failed += 1
+        if len(errors) < BULK_MAX_REPORTED_ERRORS:
+            errors.append({"row": row, "error": error})
+
+    async def flush(batch: List[Tuple[int, Dict[str, Any]]]):
+        nonlocal inserted
+        if not batch:
+            return
+        docs = [doc for _, doc in batch]
+        failed_indexes = set()
+        try:
+            await collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                failed_indexes.add(error["index"])
+                reject(batch[error["index"]][0], error.get("errmsg", "Write failed"))
+        stored = [doc for i, doc in enumerate(docs) if i not in failed_indexes]
+        inserted += len(stored)
+        if on_inserted and stored:
+            await on_inserted(stored)
+
+    batch: List[Tuple[int, Dict[str, Any]]] = []
+    payload_error = None
+    try:
+        async for record, parse_error in iter_records(chunks, content_type):
+            row = received
+            received += 1
+            if parse_error:
+                reject(row, parse_error)
+                continue
+            if not isinstance(record, dict):
+                reject(row, "Expected a JSON object")
+                continue
+            try:
+                batch.append((row, build_doc(record)))
+            except ValueError as e:
+                reject(row, str(e))
+                continue
+            if len(batch) >= BULK_CHUNK_SIZE:
+                await flush(batch)
+                batch = []
+    except MalformedPayload as e:
+        # Rows parsed before the payload broke are still stored
+        payload_error = str(e)
+    await flush(batch)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "received": received,
+        "inserted": inserted,
+        "failed": failed,
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 4),
+        "rows_per_second": round(received / elapsed, 1) if elapsed > 0 else None,
+        "payload_error": payload_error
+    }
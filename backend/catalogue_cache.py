@@ -0,0 +1,157 @@
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# local: in-process LRU; redis: shared by all workers through REDIS_URL (needs the redis package); none: off
+CATALOGUE_CACHE_BACKEND = os.getenv("CATALOGUE_CACHE_BACKEND", "local")
+CATALOGUE_CACHE_SIZE = int(os.getenv("CATALOGUE_CACHE_SIZE", "2000"))
+CATALOGUE_CACHE_TTL_SECONDS = int(os.getenv("CATALOGUE_CACHE_TTL_SECONDS", "3600"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+class LocalRedis:
+    """In-process stand-in for the Redis commands the cache uses, with LRU eviction at maxsize keys"""
+
+    def __init__(self, maxsize: int = CATALOGUE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.evictions = 0
+        self._data: "OrderedDict[str, Tuple[bytes, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def get(self, name: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(name)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[name]
+                return None
+            self._data.move_to_end(name)
+            return value
+
+    async def set(self, name: str, value: bytes, ex: Optional[int] = None) -> bool:
+        expires_at = time.monotonic() + ex if ex else None
+        with self._lock:
+            self._data[name] = (value, expires_at)
+            self._data.move_to_end(name)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return True
+
+    async def delete(self, *names: str) -> int:
+        with self._lock:
+            return sum(self._data.pop(name, None) is not None for name in names)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    async def ping(self) -> bool:
+        return True
+
+    async def aclose(self):
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"size": len(self._data), "maxsize": self.maxsize, "evictions": self.evictions}
+
+def create_client(backend: str = CATALOGUE_CACHE_BACKEND):
+    if backend == "none":
+        return None
+    if backend == "redis":
+        import redis.asyncio
+
+        return redis.asyncio.from_url(REDIS_URL)
+    return LocalRedis()
+
+class CatalogueCache:
+    """Read-through cache of listing bodies keyed by their scope-versioned ETag; cache failures fall back to the database"""
+
+    def __init__(self, client, ttl: int = CATALOGUE_CACHE_TTL_SECONDS, prefix: str = "catalogue:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        # Concurrent misses on one key share a single load
+        self._loading: Dict[str, "asyncio.Future[Tuple[bytes, Optional[str]]]"] = {}
+
+    async def get_or_load(
+        self, key: str, load: Callable[[], Awaitable[Tuple[bytes, Optional[str]]]]
+    ) -> Tuple[bytes, Optional[str]]:
+        """(body, next_cursor) for key, loading and storing it on a miss"""
+        if self.client is None:
+            return await load()
+
+        name = self.prefix + key
+        try:
+            cached = await self.client.get(name)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Catalogue cache read failed: {str(e)}")
+            return await load()
+        if cached is not None:
+            self.hits += 1
+            cursor, _, body = cached.partition(b"\n")
+            return body, cursor.decode() or None
+
+        self.misses += 1
+        pending = self._loading.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        try:
+            body, cursor = await load()
+            future.set_result((body, cursor))
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception retrieved when no other request was waiting
+            future.exception()
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            del self._loading[key]
+
+        try:
+            await self.client.set(name, (cursor or "").encode() + b"\n" + body, ex=self.ttl)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Catalogue cache write failed: {str(e)}")
+        return body, cursor
+
+    def clear_local(self):
+        """Drop in-process entries (a shared Redis is left alone)"""
+        if isinstance(self.client, LocalRedis):
+            self.client.clear()
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        stats = {
+            "backend": CATALOGUE_CACHE_BACKEND,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+        if isinstance(self.client, LocalRedis):
+            stats.update(self.client.stats())
+        return stats
+
+catalogue_cache = CatalogueCache(create_client())
@@ -0,0 +1,89 @@
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", "3000"))
+CONTEXT_FETCH_MESSAGES = int(os.getenv("CHAT_CONTEXT_FETCH_MESSAGES", "40"))
+SUMMARY_TOKEN_BUDGET = int(os.getenv("CHAT_SUMMARY_TOKEN_BUDGET", "500"))
+SUMMARY_SNIPPET_CHARS = 200
+
+_encoding = None
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            # Encoding files are fetched on first use; fall back to a rough estimate offline
+            logger.warning(f"tiktoken unavailable, estimating token counts: {str(e)}")
+            _encoding = False
+    return _encoding
+
+def count_tokens(text: str) -> int:
+    """Count model tokens in text"""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return max(1, len(text) // 4)
+
+def _snippet(text: str) -> str:
+    first = _SENTENCE_END.split(text.strip(), 1)[0]
+    return first if len(first) <= SUMMARY_SNIPPET_CHARS else first[:SUMMARY_SNIPPET_CHARS].rstrip() + "..."
+
+def fold_into_summary(summary: Optional[str], messages: List[Dict[str, Any]]) -> str:
+    """Fold older turns into the rolling summary, keeping its most recent lines within budget"""
+    lines = summary.splitlines() if summary else []
+    for message in messages:
+        speaker = "Student" if message.get("role") == "user" else "Tutor"
+        lines.append(f"{speaker}: {_snippet(message.get('content', ''))}")
+
+    while len(lines) > 1 and count_tokens("\n".join(lines)) > SUMMARY_TOKEN_BUDGET:
+        lines.pop(0)
+    return "\n".join(lines)
+
+def build_context(session_doc: Dict[str, Any], token_budget: int = CONTEXT_TOKEN_BUDGET) -> Tuple[List[Dict[str, Any]], Optional[str], int]:
+    """(window, summary, summarized_count) for a session holding its last CONTEXT_FETCH_MESSAGES messages"""
+    messages = session_doc.get("messages", [])
+    message_count = max(session_doc.get("message_count", 0), len(messages))
+    summary = session_doc.get("summary")
+    summarized_count = session_doc.get("summarized_count", 0)
+    first_index = message_count - len(messages)
+
+    used = 0
+    start = len(messages)
+    while start > 0:
+        tokens = count_tokens(messages[start - 1].get("content", ""))
+        if used + tokens > token_budget:
+            break
+        used += tokens
+        start -= 1
+
+    unsummarized = [
+        message for offset, message in enumerate(messages[:start])
+        if first_index + offset >= summarized_count
+    ]
+    if unsummarized:
+        summary = fold_into_summary(summary, unsummarized)
+        summarized_count = first_index + start
+
+    return messages[start:], summary, summarized_count
+
+def render_system_message(system_message: str, summary: Optional[str], window: List[Dict[str, Any]]) -> str:
+    """Append the rolling summary and recent turns to the tutor system prompt"""
+    parts = [system_message]
+    if summary:
+        parts.append(f"Summary of the earlier conversation:\n{summary}")
+    if window:
+        turns = "\n".join(
+            f"{'Student' if m.get('role') == 'user' else 'Tutor'}: {m.get('content', '')}" for m in window
+        )
+        parts.append(f"Recent conversation:\n{turns}")
+    return "\n\n".join(parts)
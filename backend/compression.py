@@ -0,0 +1,135 @@
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import gzip
+import os
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from conditional import opaque_tag
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional, gzip is always available
+    brotli = None
+
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+# Larger bodies are compressed in a worker thread (zlib and brotli release the GIL)
+COMPRESSION_THREAD_BYTES = int(os.getenv("COMPRESSION_THREAD_BYTES", "262144"))
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+
+def supported_encodings() -> List[str]:
+    """Encodings this server can produce, most preferred first"""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the best supported encoding the client accepts with q > 0"""
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in supported_encodings():
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    # mtime=0 keeps the output deterministic for identical bodies
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+def _is_compressible(headers: Headers) -> bool:
+    content_type = headers.get("content-type", "")
+    return "content-encoding" not in headers and content_type.startswith(COMPRESSIBLE_TYPES)
+
+def _strip_etag_suffixes(if_none_match: str) -> Tuple[str, Dict[str, str]]:
+    """Remove encoding suffixes from If-None-Match; returns the new header and base -> sent tag"""
+    sent: Dict[str, str] = {}
+    tags = []
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        for encoding in ("br", "gzip"):
+            suffix = f'-{encoding}"'
+            if tag.endswith(suffix):
+                base = tag[:-len(suffix)] + '"'
+                # Keyed by the opaque tag: a proxy may have weakened it (W/"...") on the way
+                sent[opaque_tag(base)] = tag
+                tag = base
+                break
+        tags.append(tag)
+    return ", ".join(tags), sent
+
+class CompressionMiddleware:
+    """Compresses complete responses with brotli or gzip; routes only ever see their own (unsuffixed) ETags"""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        encoding = choose_encoding(request_headers.get("accept-encoding", ""))
+        sent_etags: Dict[str, str] = {}
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match:
+            stripped, sent_etags = _strip_etag_suffixes(if_none_match)
+            if sent_etags:
+                raw = [(k, v) for k, v in scope["headers"] if k != b"if-none-match"]
+                # In place: a copy would hide the matched route from the metrics middleware's scope
+                scope["headers"] = raw + [(b"if-none-match", stripped.encode("latin-1"))]
+
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows whether the response is streamed
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            headers = MutableHeaders(raw=list(start["headers"]))
+            start = {**start, "headers": headers.raw}
+            body = message.get("body", b"")
+            if start["status"] == 304:
+                etag = headers.get("etag")
+                if etag and opaque_tag(etag) in sent_etags:
+                    headers["etag"] = sent_etags[opaque_tag(etag)]
+            elif _is_compressible(headers):
+                headers.add_vary_header("Accept-Encoding")
+                if encoding and not message.get("more_body", False) and len(body) >= self.minimum_size:
+                    if len(body) >= COMPRESSION_THREAD_BYTES:
+                        body = await asyncio.to_thread(compress, body, encoding)
+                    else:
+                        body = compress(body, encoding)
+                    headers["content-encoding"] = encoding
+                    headers["content-length"] = str(len(body))
+                    # A compressed body is a different representation, so its strong ETag gets a suffix
+                    etag = headers.get("etag")
+                    if etag and etag.startswith('"'):
+                        headers["etag"] = f'{etag[:-1]}-{encoding}"'
+                    message = {**message, "body": body}
+            await send(start)
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
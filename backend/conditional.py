@@ -0,0 +1,74 @@
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+import hashlib
+import uuid
+
+from pymongo import ReturnDocument
+
+def opaque_tag(tag: str) -> str:
+    """An entity tag without its weakness indicator"""
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True if an If-None-Match header is '*' or lists etag under weak comparison"""
+    if not if_none_match:
+        return False
+    tags = [opaque_tag(tag) for tag in if_none_match.split(",")]
+    return "*" in tags or opaque_tag(etag) in tags
+
+def _scope_id(stream: Any, class_level: Any, subject: Any) -> str:
+    # Hashed so arbitrary subject names are safe as document field names
+    return hashlib.sha1(f"{stream}|{class_level}|{subject}".encode()).hexdigest()[:16]
+
+def listing_scope(stream: Optional[str] = None, class_level: Optional[int] = None, subject: Optional[str] = None) -> str:
+    """Scope of a listing filtered by the given values (None = not filtered)"""
+    return _scope_id(stream or "*", class_level or "*", subject or "*")
+
+def affected_scopes(docs: Iterable[Dict[str, Any]]) -> Set[str]:
+    """Every listing scope that can include any of the documents"""
+    scopes = set()
+    for doc in docs:
+        stream = getattr(doc.get("stream"), "value", doc.get("stream"))
+        for s in (stream, "*"):
+            for c in (doc.get("class_level"), "*"):
+                for subject in (doc.get("subject"), "*"):
+                    scopes.add(_scope_id(s, c, subject))
+    return scopes
+
+class ContentVersions:
+    """Per-collection scope generations stored as {_id: name, epoch, scopes: {scope: generation}}"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def bump(self, name: str, docs: Optional[Iterable[Dict[str, Any]]] = None):
+        """Record a write of docs; without docs (unknown scope) every listing of the collection changes"""
+        if docs is None:
+            # A new random epoch (also set when a database is created) means no earlier ETag can match
+            update = {"$set": {"epoch": uuid.uuid4().hex}}
+        else:
+            scopes = affected_scopes(docs)
+            if not scopes:
+                return
+            update = {
+                "$inc": {f"scopes.{scope}": 1 for scope in scopes},
+                "$setOnInsert": {"epoch": uuid.uuid4().hex}
+            }
+        await self.collection.update_one({"_id": name}, update, upsert=True)
+
+    async def get(self, name: str, scope: str) -> Tuple[str, int]:
+        """(epoch, generation) of one listing scope"""
+        doc = await self.collection.find_one({"_id": name}, {"epoch": 1, f"scopes.{scope}": 1})
+        if doc is None:
+            # First read of a fresh database: create the counter so its epoch is fixed
+            doc = await self.collection.find_one_and_update(
+                {"_id": name}, {"$setOnInsert": {"epoch": uuid.uuid4().hex}},
+                upsert=True, return_document=ReturnDocument.AFTER
+            )
+        return doc["epoch"], doc.get("scopes", {}).get(scope, 0)
+
+    async def etag(self, name: str, scope: str, params: Iterable[Tuple[str, str]], variant: str = "") -> str:
+        """Strong ETag for a listing of `name` in `scope`; variant names other state it reads (a search index generation)"""
+        epoch, generation = await self.get(name, scope)
+        key = f"{name}:{epoch}:{scope}:{generation}:{variant}:" + "&".join(f"{k}={v}" for k, v in sorted(params))
+        return f'"{hashlib.sha1(key.encode()).hexdigest()[:20]}"'
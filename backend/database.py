@@ -1,13 +1,133 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
 from dotenv import load_dotenv
+from indexes import apply_indexes
+from metrics import command_metrics
+from typing import Any, Dict, Optional
+import logging
 import os
+import threading
+import time
 
 load_dotenv()
 
 mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017/')
 db_name = os.environ.get('DB_NAME', 'ai_tutor')
 
-client = AsyncIOMotorClient(mongo_url)
+logger = logging.getLogger(__name__)
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+# Connection pool settings; unset values fall back to the driver defaults
+MONGO_CLIENT_OPTIONS: Dict[str, Any] = {
+    key: value for key, value in {
+        "maxPoolSize": _env_int("MONGO_MAX_POOL_SIZE"),
+        "minPoolSize": _env_int("MONGO_MIN_POOL_SIZE"),
+        "maxConnecting": _env_int("MONGO_MAX_CONNECTING"),
+        "maxIdleTimeMS": _env_int("MONGO_MAX_IDLE_TIME_MS"),
+        "waitQueueTimeoutMS": _env_int("MONGO_WAIT_QUEUE_TIMEOUT_MS"),
+        "connectTimeoutMS": _env_int("MONGO_CONNECT_TIMEOUT_MS"),
+        "socketTimeoutMS": _env_int("MONGO_SOCKET_TIMEOUT_MS"),
+        "serverSelectionTimeoutMS": _env_int("MONGO_SERVER_SELECTION_TIMEOUT_MS"),
+        "readPreference": os.environ.get("MONGO_READ_PREFERENCE"),
+        "appname": os.environ.get("MONGO_APP_NAME", "ai-tutor"),
+    }.items() if value is not None
+}
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Connection pool (CMAP) event listener tracking checkouts and wait-queue time"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # pymongo checks connections out on the executor thread running the operation
+        self._local = threading.local()
+        self.open_connections = 0
+        self.checked_out = 0
+        self.peak_checked_out = 0
+        self.waiting = 0
+        self.checkouts = 0
+        self.checkout_failures: Dict[str, int] = {}
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.pool_clears = 0
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+        with self._lock:
+            self.waiting += 1
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, "started", None)
+        waited = time.perf_counter() - started if started is not None else 0.0
+        with self._lock:
+            self.waiting -= 1
+            self.checkouts += 1
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.waiting -= 1
+            self.checkout_failures[event.reason] = self.checkout_failures.get(event.reason, 0) + 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections -= 1
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "open_connections": self.open_connections,
+                "checked_out": self.checked_out,
+                "peak_checked_out": self.peak_checked_out,
+                "waiting": self.waiting,
+                "checkouts": self.checkouts,
+                "checkout_failures": dict(self.checkout_failures),
+                "avg_wait_ms": round(self.wait_seconds_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.wait_seconds_max * 1000, 3),
+                "pool_clears": self.pool_clears,
+                "options": MONGO_CLIENT_OPTIONS
+            }
+
+pool_metrics = PoolMetrics()
+
+# 'mongo' (default) or 'memory' for the in-process backend used by benchmarks and hermetic runs
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'mongo')
+
+def create_client(**overrides) -> AsyncIOMotorClient:
+    """Motor client configured from the MONGO_* pool settings, reporting pool and command metrics"""
+    if STORAGE_BACKEND == "memory":
+        from memory_store import MemoryClient
+        return MemoryClient()
+    return AsyncIOMotorClient(mongo_url, event_listeners=[pool_metrics, command_metrics], **{**MONGO_CLIENT_OPTIONS, **overrides})
+
+# Connections are opened lazily; connect_db verifies the cluster at startup
+client = create_client()
 db = client[db_name]
 
 # Collections
@@ -19,13 +139,20 @@ quiz_attempts_collection = db.quiz_attempts
 chat_sessions_collection = db.chat_sessions
 topic_progress_collection = db.topic_progress
 student_profiles_collection = db.student_profiles
+user_stats_collection = db.user_stats
+content_versions_collection = db.content_versions
 
 async def init_db():
-    """Initialize database with indexes"""
-    # Create indexes for better query performance
-    await users_collection.create_index("email", unique=True)
-    await books_collection.create_index([("stream", 1), ("class_level", 1), ("subject", 1)])
-    await videos_collection.create_index([("stream", 1), ("class_level", 1), ("subject", 1)])
-    await quizzes_collection.create_index([("stream", 1), ("class_level", 1), ("subject", 1)])
-    await chat_sessions_collection.create_index("user_id")
-    await topic_progress_collection.create_index([("user_id", 1), ("subject", 1), ("topic", 1)])
+    """Initialize database with the indexes the API's query shapes need"""
+    await apply_indexes(db)
+
+async def connect_db():
+    """Fail fast at startup if the cluster is unreachable"""
+    await client.admin.command("ping")
+    if STORAGE_BACKEND == "memory":
+        logger.info("Using the in-memory storage backend")
+    else:
+        logger.info(f"Connected to MongoDB with pool options {MONGO_CLIENT_OPTIONS}")
+
+def close_db():
+    client.close()
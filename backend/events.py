@@ -0,0 +1,41 @@
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Union
+import inspect
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Content became visible in listings (admin upload or moderator approval)
+CONTENT_PUBLISHED = "content.published"
+# Pending content was rejected by a moderator
+CONTENT_REJECTED = "content.rejected"
+
+Handler = Callable[[Dict[str, Any]], Union[None, Awaitable[None]]]
+
+class EventBus:
+    """In-process publish/subscribe keeping caches and indexes in step with writes; failing handlers are only logged"""
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Handler]] = defaultdict(list)
+        self.published: Dict[str, int] = defaultdict(int)
+
+    def subscribe(self, event: str, handler: Handler):
+        self._handlers[event].append(handler)
+
+    async def publish(self, event: str, payload: Dict[str, Any]):
+        self.published[event] += 1
+        for handler in self._handlers.get(event, []):
+            try:
+                result = handler(payload)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.exception(f"Event handler for {event} failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "published": dict(self.published),
+            "subscribers": {event: len(handlers) for event, handlers in self._handlers.items()}
+        }
+
+events = EventBus()
@@ -0,0 +1,24 @@
+from typing import List, Sequence, Tuple
+import numpy as np
+
+def grade_answers(answer_key: np.ndarray, answers: Sequence[int]) -> Tuple[int, float]:
+    """Grade one attempt; returns (correct_count, score percentage)"""
+    total = len(answer_key)
+    if not total:
+        return 0, 0
+    submitted = np.asarray(answers[:total], dtype=np.int64)
+    correct = int(np.count_nonzero(submitted == answer_key[:len(submitted)]))
+    return correct, (correct / total) * 100
+
+def grade_many(answer_key: np.ndarray, attempts: List[Sequence[int]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Grade many attempts at one quiz at once; returns (correct_counts, scores)"""
+    total = len(answer_key)
+    if not total:
+        zeros = np.zeros(len(attempts))
+        return zeros.astype(np.int64), zeros
+    matrix = np.full((len(attempts), total), -1, dtype=np.int64)
+    for row, answers in enumerate(attempts):
+        answers = answers[:total]
+        matrix[row, :len(answers)] = answers
+    correct = np.count_nonzero(matrix == answer_key, axis=1)
+    return correct, correct / total * 100
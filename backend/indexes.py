@@ -0,0 +1,172 @@
+"""
+Declarative index registry
+Run: python indexes.py [--check]
+"""
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import asyncio
+import logging
+import sys
+
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+CREATED = [("created_at", -1), ("id", -1)]
+UPDATED = [("updated_at", -1), ("id", -1)]
+
+# Explained queries fetch one listing page; a plan may examine at most this many documents per one returned
+EXPLAIN_LIMIT = 100
+MAX_DOCS_EXAMINED_RATIO = 10
+
+class IndexSpec(NamedTuple):
+    collection: str
+    keys: List[Tuple[str, int]]
+    unique: bool = False
+    name: Optional[str] = None
+    partial: Optional[Dict[str, Any]] = None
+
+class QueryShape(NamedTuple):
+    """A representative query issued by the API (values are placeholders)"""
+    name: str
+    collection: str
+    filter: Dict[str, Any]
+    sort: Optional[List[Tuple[str, int]]] = None
+
+INDEXES: List[IndexSpec] = [
+    IndexSpec("users", [("email", 1)], unique=True),
+    IndexSpec("users", [("id", 1)], unique=True),
+    # Catalogue listings filter on approved (plus optional taxonomy fields) and page by CREATED_ORDER
+    IndexSpec("books", [("id", 1)], unique=True),
+    IndexSpec("books", [("approved", 1), *CREATED]),
+    IndexSpec("books", [("approved", 1), ("stream", 1), ("class_level", 1), ("subject", 1), *CREATED]),
+    IndexSpec("books", [("approved", 1), ("subject", 1), *CREATED]),
+    IndexSpec("books", [("rejected", 1), *CREATED], name="moderation_queue", partial={"approved": False}),
+    IndexSpec("videos", [("id", 1)], unique=True),
+    IndexSpec("videos", [("approved", 1), *CREATED]),
+    IndexSpec("videos", [("approved", 1), ("stream", 1), ("class_level", 1), ("subject", 1), *CREATED]),
+    IndexSpec("videos", [("approved", 1), ("subject", 1), *CREATED]),
+    IndexSpec("videos", [("rejected", 1), *CREATED], name="moderation_queue", partial={"approved": False}),
+    IndexSpec("quizzes", [("id", 1)], unique=True),
+    IndexSpec("quizzes", CREATED),
+    IndexSpec("quizzes", [("stream", 1), ("class_level", 1), ("subject", 1), *CREATED]),
+    IndexSpec("quizzes", [("subject", 1), *CREATED]),
+    IndexSpec("quiz_attempts", [("user_id", 1), ("completed_at", -1)]),
+    IndexSpec("chat_sessions", [("id", 1)]),
+    IndexSpec("chat_sessions", [("user_id", 1), *UPDATED]),
+    # Unique so concurrent progress upserts cannot create duplicate topic documents
+    IndexSpec("topic_progress", [("user_id", 1), ("subject", 1), ("topic", 1)], unique=True, name="user_topic_unique"),
+    IndexSpec("user_stats", [("user_id", 1)], unique=True),
+]
+
+# Superseded by the compound indexes above; dropped if still present
+RETIRED_INDEXES: List[Tuple[str, str]] = [
+    ("books", "stream_1_class_level_1_subject_1"),
+    ("videos", "stream_1_class_level_1_subject_1"),
+    ("quizzes", "stream_1_class_level_1_subject_1"),
+    ("chat_sessions", "user_id_1"),
+    # Non-unique under the default name, which would block the unique index above
+    ("topic_progress", "user_id_1_subject_1_topic_1"),
+]
+
+PENDING = {"approved": False, "rejected": {"$in": [False, None]}}
+TAXONOMY_PATH = {"stream": "CBSE", "class_level": 10, "subject": "Physics"}
+
+QUERY_SHAPES: List[QueryShape] = [
+    QueryShape("current user", "users", {"id": "u"}),
+    QueryShape("login", "users", {"email": "e"}),
+    QueryShape("book by id", "books", {"id": "b"}),
+    QueryShape("book listing", "books", {"approved": True}, CREATED),
+    QueryShape("book listing by subject", "books", {"approved": True, **TAXONOMY_PATH, "topic": "t"}, CREATED),
+    QueryShape("book listing by subject only", "books", {"approved": True, "subject": "Physics"}, CREATED),
+    QueryShape("book search candidates", "books", {"approved": True, "id": {"$in": ["b"]}}),
+    QueryShape("book moderation queue", "books", PENDING, CREATED),
+    QueryShape("video by id", "videos", {"id": "v"}),
+    QueryShape("video listing", "videos", {"approved": True}, CREATED),
+    QueryShape("video listing by subject", "videos", {"approved": True, **TAXONOMY_PATH}, CREATED),
+    QueryShape("video listing by subject only", "videos", {"approved": True, "subject": "Physics"}, CREATED),
+    QueryShape("video moderation queue", "videos", PENDING, CREATED),
+    QueryShape("quiz answer keys", "quizzes", {"id": {"$in": ["q"]}}),
+    QueryShape("quiz listing", "quizzes", {}, CREATED),
+    QueryShape("quiz listing by subject", "quizzes", TAXONOMY_PATH, CREATED),
+    QueryShape("quiz listing by subject only", "quizzes", {"subject": "Physics"}, CREATED),
+    QueryShape("user quiz attempts", "quiz_attempts", {"user_id": "u"}),
+    QueryShape("chat session", "chat_sessions", {"id": "s", "user_id": "u"}),
+    QueryShape("chat session listing", "chat_sessions", {"user_id": "u"}, UPDATED),
+    QueryShape("topic progress", "topic_progress", {"user_id": "u"}, [("subject", 1), ("topic", 1)]),
+    QueryShape("subject progress", "topic_progress", {"user_id": "u", "subject": "s"}, [("subject", 1), ("topic", 1)]),
+    QueryShape("topic progress update", "topic_progress", {"user_id": "u", "subject": "s", "topic": "t"}),
+    QueryShape("user stats", "user_stats", {"user_id": "u"}),
+]
+
+async def apply_indexes(db) -> None:
+    """Create registered indexes and drop retired ones; safe to run on every startup"""
+    for collection, name in RETIRED_INDEXES:
+        try:
+            await db[collection].drop_index(name)
+            logger.info(f"Dropped retired index {collection}.{name}")
+        except OperationFailure:
+            pass
+
+    for spec in INDEXES:
+        options: Dict[str, Any] = {}
+        if spec.unique:
+            options["unique"] = True
+        if spec.name:
+            options["name"] = spec.name
+        if spec.partial:
+            options["partialFilterExpression"] = spec.partial
+        try:
+            await db[spec.collection].create_index(spec.keys, **options)
+        except OperationFailure as e:
+            # e.g. duplicate data blocking a unique index; the API still works, just slower or less strict
+            logger.warning(f"Could not create index on {spec.collection} {spec.keys}: {str(e)}")
+
+def _plan_stages(plan: Any) -> List[str]:
+    """All stage names in an explain plan tree (classic and slot-based engine formats)"""
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(_plan_stages(item))
+    return stages
+
+async def check_query_plans(db) -> List[str]:
+    """Explain every registered query shape; returns the names of those that scan or examine too much"""
+    failed = []
+    for shape in QUERY_SHAPES:
+        cursor = db[shape.collection].find(shape.filter)
+        if shape.sort:
+            cursor = cursor.sort(shape.sort)
+        explain = await cursor.limit(EXPLAIN_LIMIT).explain()
+        stages = _plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {}))
+        stats = explain.get("executionStats", {})
+        examined, returned = stats.get("totalDocsExamined", 0), stats.get("nReturned", 0)
+        if "COLLSCAN" in stages:
+            failed.append(shape.name)
+            logger.error(f"Query shape '{shape.name}' on {shape.collection} does a collection scan")
+        elif examined > max(returned, 1) * MAX_DOCS_EXAMINED_RATIO:
+            failed.append(shape.name)
+            logger.error(
+                f"Query shape '{shape.name}' on {shape.collection} examined {examined} documents to return {returned}"
+            )
+        elif shape.sort and "SORT" in stages:
+            logger.warning(f"Query shape '{shape.name}' on {shape.collection} sorts in memory")
+    return failed
+
+async def main(check: bool) -> int:
+    from database import db
+
+    await apply_indexes(db)
+    if not check:
+        return 0
+    failed = await check_query_plans(db)
+    print(f"{len(QUERY_SHAPES) - len(failed)}/{len(QUERY_SHAPES)} query shapes use a selective index")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(asyncio.run(main("--check" in sys.argv)))
@@ -0,0 +1,1174 @@
+from collections import defaultdict
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import re
+
+from bson import ObjectId
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.results import (
+    BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+)
+
+_MISSING = object()
+
+# ---------------------------------------------------------------- values
+
+def _to_bson(value: Any) -> Any:
+    """Copy a value the way a BSON round trip would store it"""
+    if isinstance(value, dict):
+        return {str(k): _to_bson(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [_to_bson(v) for v in value]
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+def _copy(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    return value
+
+_RANKS = {type(None): 1, bool: 8, int: 2, float: 2, str: 3, dict: 4, list: 5, bytes: 6, ObjectId: 7, datetime: 9}
+
+def _type_rank(value: Any) -> int:
+    """BSON comparison order of a value's type"""
+    rank = _RANKS.get(type(value))
+    if rank is not None:
+        return rank
+    if value is None or value is _MISSING:
+        return 1
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, str):
+        return 3
+    if isinstance(value, dict):
+        return 4
+    if isinstance(value, list):
+        return 5
+    if isinstance(value, bytes):
+        return 6
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime):
+        return 9
+    return 10
+
+def _sort_key(value: Any) -> tuple:
+    """Hashable key ordering values like MongoDB does across and within types"""
+    rank = _type_rank(value)
+    if rank == 1:
+        return (1,)
+    if rank == 4:
+        return (4, tuple((k, _sort_key(v)) for k, v in value.items()))
+    if rank == 5:
+        return (5, tuple(_sort_key(v) for v in value))
+    if rank == 10:
+        return (10, repr(value))
+    return (rank, value)
+
+def _equal(a: Any, b: Any) -> bool:
+    return _sort_key(a) == _sort_key(b)
+
+def _compare(a: Any, b: Any) -> Optional[int]:
+    """-1/0/1 for values of the same type bracket, None when MongoDB would not compare them"""
+    if _type_rank(a) != _type_rank(b):
+        return None
+    ka, kb = _sort_key(a), _sort_key(b)
+    return (ka > kb) - (ka < kb)
+
+# ---------------------------------------------------------------- paths
+
+def _lookup(value: Any, parts: List[str]) -> List[Any]:
+    """Values at a dotted path, descending into arrays of subdocuments"""
+    if not parts:
+        return [value]
+    if isinstance(value, dict):
+        if parts[0] in value:
+            return _lookup(value[parts[0]], parts[1:])
+        return []
+    if isinstance(value, list):
+        if parts[0].isdigit():
+            index = int(parts[0])
+            return _lookup(value[index], parts[1:]) if index < len(value) else []
+        found = []
+        for item in value:
+            if isinstance(item, dict):
+                found.extend(_lookup(item, parts))
+        return found
+    return []
+
+def _get(doc: Dict[str, Any], path: str, default: Any = None) -> Any:
+    """Single value at a dotted path (used by sort, expressions and index keys)"""
+    value: Any = doc
+    for part in path.split("."):
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        else:
+            return default
+    return value
+
+def _set(doc: Dict[str, Any], path: str, value: Any):
+    parts = path.split(".")
+    target: Any = doc
+    for part in parts[:-1]:
+        if isinstance(target, list) and part.isdigit():
+            target = target[int(part)]
+            continue
+        if not isinstance(target.get(part), (dict, list)):
+            target[part] = {}
+        target = target[part]
+    if isinstance(target, list) and parts[-1].isdigit():
+        index = int(parts[-1])
+        target.extend([None] * (index + 1 - len(target)))
+        target[index] = value
+    else:
+        target[parts[-1]] = value
+
+def _unset(doc: Dict[str, Any], path: str):
+    parts = path.split(".")
+    target = _get(doc, ".".join(parts[:-1])) if len(parts) > 1 else doc
+    if isinstance(target, dict):
+        target.pop(parts[-1], None)
+
+# ---------------------------------------------------------------- queries
+
+def _candidates(doc: Dict[str, Any], path: str) -> List[Any]:
+    """Values a query condition is tested against: the field and, for arrays, its elements"""
+    values = []
+    for value in _lookup(doc, path.split(".")):
+        values.append(value)
+        if isinstance(value, list):
+            values.extend(value)
+    return values
+
+def _regex(pattern: Any, options: str = "") -> "re.Pattern":
+    if isinstance(pattern, re.Pattern):
+        return pattern
+    flags = 0
+    for option, flag in (("i", re.IGNORECASE), ("m", re.MULTILINE), ("s", re.DOTALL), ("x", re.VERBOSE)):
+        if option in options:
+            flags |= flag
+    return re.compile(pattern, flags)
+
+def _eq_any(values: List[Any], target: Any) -> bool:
+    if isinstance(target, re.Pattern):
+        return any(isinstance(v, str) and target.search(v) for v in values)
+    if target is None and not values:
+        return True
+    return any(_equal(v, target) for v in values)
+
+class _InSet:
+    """Pre-hashed $in/$nin operand so membership is O(1) per candidate value"""
+
+    __slots__ = ("keys", "patterns")
+
+    def __init__(self, items: List[Any]):
+        self.patterns = [item for item in items if isinstance(item, re.Pattern)]
+        self.keys = {_sort_key(item) for item in items if not isinstance(item, re.Pattern)}
+
+    def contains(self, values: List[Any]) -> bool:
+        if not values and (1,) in self.keys:
+            return True
+        keys = self.keys
+        return any(_sort_key(v) in keys for v in values) or any(_eq_any(values, p) for p in self.patterns)
+
+def prepare_query(query: Any) -> Any:
+    """Copy of a filter with $in/$nin operands pre-hashed, for matching many documents"""
+    if isinstance(query, list):
+        return [prepare_query(item) for item in query]
+    if not isinstance(query, dict):
+        return query
+    prepared = {}
+    for key, value in query.items():
+        if key in ("$in", "$nin") and isinstance(value, list):
+            prepared[key] = _InSet(value)
+        elif key in ("$and", "$or", "$nor") or isinstance(value, dict):
+            prepared[key] = prepare_query(value)
+        else:
+            prepared[key] = value
+    return prepared
+
+def _match_operators(values: List[Any], present: bool, cond: Dict[str, Any]) -> bool:
+    for op, arg in cond.items():
+        if op == "$eq":
+            ok = _eq_any(values, arg)
+        elif op == "$ne":
+            ok = not _eq_any(values, arg)
+        elif op in ("$in", "$nin"):
+            if not isinstance(arg, _InSet):
+                arg = _InSet(arg)
+            ok = arg.contains(values) == (op == "$in")
+        elif op in ("$gt", "$gte", "$lt", "$lte"):
+            ok = False
+            for value in values:
+                result = _compare(value, arg)
+                if result is not None and (
+                    (op == "$gt" and result > 0) or (op == "$gte" and result >= 0)
+                    or (op == "$lt" and result < 0) or (op == "$lte" and result <= 0)
+                ):
+                    ok = True
+                    break
+        elif op == "$exists":
+            ok = present == bool(arg)
+        elif op == "$regex":
+            pattern = _regex(arg, cond.get("$options", ""))
+            ok = any(isinstance(v, str) and pattern.search(v) for v in values)
+        elif op == "$options":
+            ok = True
+        elif op == "$size":
+            ok = any(isinstance(v, list) and len(v) == arg for v in values)
+        elif op == "$all":
+            ok = all(_eq_any(values, item) for item in arg)
+        elif op == "$elemMatch":
+            ok = any(
+                isinstance(v, list) and any(isinstance(item, dict) and matches(item, arg) for item in v)
+                for v in values
+            )
+        elif op == "$not":
+            ok = not _match_operators(values, present, arg if isinstance(arg, dict) else {"$regex": arg})
+        else:
+            raise OperationFailure(f"Unsupported query operator {op} in memory backend")
+        if not ok:
+            return False
+    return True
+
+def _match_field(doc: Dict[str, Any], path: str, cond: Any) -> bool:
+    if "." in path:
+        values = _candidates(doc, path)
+        present = bool(_lookup(doc, path.split(".")))
+    else:
+        value = doc.get(path, _MISSING)
+        present = value is not _MISSING
+        values = [] if not present else [value, *value] if isinstance(value, list) else [value]
+    if isinstance(cond, dict) and cond and all(key.startswith("$") for key in cond):
+        return _match_operators(values, present, cond)
+    return _eq_any(values, cond)
+
+def matches(doc: Dict[str, Any], query: Optional[Dict[str, Any]]) -> bool:
+    """Whether a document satisfies a MongoDB query filter"""
+    for key, cond in (query or {}).items():
+        if key == "$and":
+            if not all(matches(doc, clause) for clause in cond):
+                return False
+        elif key == "$or":
+            if not any(matches(doc, clause) for clause in cond):
+                return False
+        elif key == "$nor":
+            if any(matches(doc, clause) for clause in cond):
+                return False
+        elif key == "$expr":
+            if not evaluate(cond, doc):
+                return False
+        elif not _match_field(doc, key, cond):
+            return False
+    return True
+
+# ---------------------------------------------------------------- expressions
+
+def _numbers(values: Iterable[Any]) -> List[Any]:
+    return [v for v in values if _type_rank(v) == 2]
+
+def evaluate(expr: Any, doc: Dict[str, Any]) -> Any:
+    """Evaluate an aggregation expression against a document"""
+    if isinstance(expr, str):
+        if expr == "$$ROOT":
+            return doc
+        if expr.startswith("$"):
+            return _get(doc, expr[1:])
+        return expr
+    if isinstance(expr, list):
+        return [evaluate(item, doc) for item in expr]
+    if not isinstance(expr, dict):
+        return expr
+    if len(expr) != 1 or not next(iter(expr)).startswith("$"):
+        return {key: evaluate(value, doc) for key, value in expr.items()}
+
+    op, arg = next(iter(expr.items()))
+    if op == "$literal":
+        return arg
+    if op == "$cond":
+        if isinstance(arg, dict):
+            arg = [arg["if"], arg["then"], arg["else"]]
+        return evaluate(arg[1] if evaluate(arg[0], doc) else arg[2], doc)
+    if op == "$ifNull":
+        for item in arg:
+            value = evaluate(item, doc)
+            if value is not None:
+                return value
+        return None
+
+    args = evaluate(arg, doc)
+    if op in ("$add", "$multiply", "$subtract", "$divide", "$mod"):
+        if any(value is None for value in args):
+            return None
+        if op == "$add":
+            return sum(args)
+        if op == "$multiply":
+            result = 1
+            for value in args:
+                result *= value
+            return result
+        if op == "$subtract":
+            return args[0] - args[1]
+        if op == "$divide":
+            return args[0] / args[1]
+        return args[0] % args[1]
+    if op in ("$min", "$max", "$sum", "$avg"):
+        values = args if isinstance(args, list) else [args]
+        if len(values) == 1 and isinstance(values[0], list):
+            values = values[0]
+        values = [v for v in values if v is not None]
+        if op == "$sum":
+            return sum(_numbers(values))
+        if op == "$avg":
+            numbers = _numbers(values)
+            return sum(numbers) / len(numbers) if numbers else None
+        if not values:
+            return None
+        keyed = sorted(values, key=_sort_key)
+        return keyed[0] if op == "$min" else keyed[-1]
+    if op in ("$eq", "$ne", "$gt", "$gte", "$lt", "$lte", "$cmp"):
+        a, b = _sort_key(args[0]), _sort_key(args[1])
+        return {
+            "$eq": a == b, "$ne": a != b, "$gt": a > b, "$gte": a >= b,
+            "$lt": a < b, "$lte": a <= b, "$cmp": (a > b) - (a < b)
+        }[op]
+    if op == "$and":
+        return all(args)
+    if op == "$or":
+        return any(args)
+    if op == "$not":
+        return not (args[0] if isinstance(args, list) else args)
+    if op == "$size":
+        value = args[0] if isinstance(arg, list) else args
+        if not isinstance(value, list):
+            raise OperationFailure("The argument to $size must be an array")
+        return len(value)
+    if op == "$in":
+        return any(_equal(args[0], item) for item in args[1])
+    if op == "$arrayElemAt":
+        array, index = args
+        return array[index] if array and -len(array) <= index < len(array) else None
+    if op == "$concat":
+        return None if any(v is None for v in args) else "".join(args)
+    if op == "$toLower":
+        return (args[0] if isinstance(args, list) else args or "").lower()
+    if op == "$toUpper":
+        return (args[0] if isinstance(args, list) else args or "").upper()
+    if op in ("$floor", "$ceil", "$abs"):
+        import math
+        value = args[0] if isinstance(args, list) else args
+        return None if value is None else {"$floor": math.floor, "$ceil": math.ceil, "$abs": abs}[op](value)
+    if op == "$round":
+        value, places = (args + [0])[:2] if isinstance(args, list) else (args, 0)
+        return None if value is None else round(value, places)
+    raise OperationFailure(f"Unsupported expression operator {op} in memory backend")
+
+# ---------------------------------------------------------------- projection
+
+def _is_expression(spec: Any) -> bool:
+    return isinstance(spec, dict) and not (len(spec) == 1 and next(iter(spec)) in ("$slice", "$elemMatch"))
+
+def _include_path(source: Any, target: Dict[str, Any], parts: List[str]):
+    if not isinstance(source, dict) or parts[0] not in source:
+        return
+    value = source[parts[0]]
+    if len(parts) == 1:
+        target[parts[0]] = _copy(value)
+    elif isinstance(value, dict):
+        _include_path(value, target.setdefault(parts[0], {}), parts[1:])
+    elif isinstance(value, list):
+        items = target.setdefault(parts[0], [{} for item in value if isinstance(item, dict)])
+        for item, out in zip([item for item in value if isinstance(item, dict)], items):
+            _include_path(item, out, parts[1:])
+
+def _slice(value: Any, spec: Any) -> Any:
+    if not isinstance(value, list):
+        return value
+    if isinstance(spec, list):
+        skip, limit = spec
+        start = skip if skip >= 0 else max(len(value) + skip, 0)
+        return value[start:start + limit]
+    return value[:spec] if spec >= 0 else value[spec:]
+
+def project(doc: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Apply a find() projection, returning a new document"""
+    if not projection:
+        return _copy(doc)
+    fields = {key: spec for key, spec in projection.items() if key != "_id"}
+    inclusion = any(
+        (spec is True or (isinstance(spec, (int, float)) and not isinstance(spec, bool) and spec))
+        or _is_expression(spec)
+        for spec in fields.values()
+    )
+    include_id = bool(projection.get("_id", 1))
+
+    if inclusion:
+        result: Dict[str, Any] = {}
+        if include_id and "_id" in doc:
+            result["_id"] = doc["_id"]
+        for key, spec in fields.items():
+            if _is_expression(spec):
+                _set(result, key, evaluate(spec, doc))
+            elif isinstance(spec, dict) and "$slice" in spec:
+                value = _get(doc, key, _MISSING)
+                if value is not _MISSING:
+                    _set(result, key, _slice(_copy(value), spec["$slice"]))
+            elif spec:
+                _include_path(doc, result, key.split("."))
+        return result
+
+    result = _copy(doc)
+    if not include_id:
+        result.pop("_id", None)
+    for key, spec in fields.items():
+        if isinstance(spec, dict) and "$slice" in spec:
+            value = _get(result, key, _MISSING)
+            if value is not _MISSING:
+                _set(result, key, _slice(value, spec["$slice"]))
+        elif not spec:
+            _unset(result, key)
+    return result
+
+def sort_documents(docs: List[Dict[str, Any]], sort: List[Tuple[str, int]]) -> List[Dict[str, Any]]:
+    for field, direction in reversed(sort):
+        docs.sort(key=lambda doc: _sort_key(_get(doc, field)), reverse=direction < 0)
+    return docs
+
+def _normalize_sort(key_or_list: Any, direction: Optional[int] = None) -> List[Tuple[str, int]]:
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction or 1)]
+    if isinstance(key_or_list, dict):
+        return list(key_or_list.items())
+    return [tuple(item) for item in key_or_list]
+
+# ---------------------------------------------------------------- updates
+
+def _apply_operators(doc: Dict[str, Any], update: Dict[str, Any], inserting: bool):
+    for op, fields in update.items():
+        if op == "$setOnInsert":
+            if not inserting:
+                continue
+            op = "$set"
+        for path, value in fields.items():
+            if op == "$set":
+                _set(doc, path, _to_bson(value))
+            elif op == "$unset":
+                _unset(doc, path)
+            elif op == "$inc":
+                _set(doc, path, (_get(doc, path) or 0) + value)
+            elif op == "$mul":
+                _set(doc, path, (_get(doc, path) or 0) * value)
+            elif op in ("$min", "$max"):
+                current = _get(doc, path, _MISSING)
+                if current is _MISSING or (
+                    (_sort_key(value) < _sort_key(current)) if op == "$min" else (_sort_key(value) > _sort_key(current))
+                ):
+                    _set(doc, path, _to_bson(value))
+            elif op in ("$push", "$addToSet"):
+                current = _get(doc, path, _MISSING)
+                if current is _MISSING or current is None:
+                    current = []
+                    _set(doc, path, current)
+                elif not isinstance(current, list):
+                    raise OperationFailure(f"The field '{path}' must be an array")
+                each = value.get("$each") if isinstance(value, dict) and "$each" in value else [value]
+                for item in _to_bson(each):
+                    if op == "$push" or not any(_equal(item, existing) for existing in current):
+                        current.append(item)
+                if op == "$push" and isinstance(value, dict) and "$slice" in value:
+                    current[:] = _slice(current, value["$slice"])
+            elif op == "$pull":
+                current = _get(doc, path)
+                if isinstance(current, list):
+                    current[:] = [
+                        item for item in current
+                        if not (matches(item, value) if isinstance(value, dict) and isinstance(item, dict) else _equal(item, value))
+                    ]
+            elif op == "$currentDate":
+                _set(doc, path, datetime.utcnow())
+            else:
+                raise OperationFailure(f"Unsupported update operator {op} in memory backend")
+
+def _apply_pipeline(doc: Dict[str, Any], pipeline: List[Dict[str, Any]]) -> Dict[str, Any]:
+    for stage in pipeline:
+        (op, spec), = stage.items()
+        if op in ("$set", "$addFields"):
+            values = {path: _to_bson(evaluate(expr, doc)) for path, expr in spec.items()}
+            for path, value in values.items():
+                _set(doc, path, value)
+        elif op == "$unset":
+            for path in [spec] if isinstance(spec, str) else spec:
+                _unset(doc, path)
+        elif op in ("$project", "$replaceRoot", "$replaceWith"):
+            new_root = project(doc, spec) if op == "$project" else evaluate(spec.get("newRoot", spec) if op == "$replaceRoot" else spec, doc)
+            new_root.setdefault("_id", doc.get("_id"))
+            doc.clear()
+            doc.update(new_root)
+        else:
+            raise OperationFailure(f"Unsupported update pipeline stage {op} in memory backend")
+    return doc
+
+def apply_update(doc: Dict[str, Any], update: Any, inserting: bool = False) -> Dict[str, Any]:
+    if isinstance(update, list):
+        return _apply_pipeline(doc, update)
+    if update and not all(key.startswith("$") for key in update):
+        raise OperationFailure("Update document requires atomic operators")
+    _apply_operators(doc, update, inserting)
+    return doc
+
+def _upsert_seed(query: Dict[str, Any]) -> Dict[str, Any]:
+    """Equality fields of a filter that become part of an upserted document"""
+    seed: Dict[str, Any] = {}
+    for key, cond in query.items():
+        if key == "$and":
+            for clause in cond:
+                for path, value in _upsert_seed(clause).items():
+                    _set(seed, path, value)
+        elif key.startswith("$"):
+            continue
+        elif isinstance(cond, dict) and cond and all(k.startswith("$") for k in cond):
+            if "$eq" in cond:
+                _set(seed, key, _to_bson(cond["$eq"]))
+        else:
+            _set(seed, key, _to_bson(cond))
+    return seed
+
+# ---------------------------------------------------------------- aggregation
+
+_ACCUMULATORS = ("$sum", "$avg", "$min", "$max", "$first", "$last", "$push", "$addToSet", "$count")
+
+def _group(docs: List[Dict[str, Any]], spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    groups: Dict[tuple, Dict[str, Any]] = {}
+    members: Dict[tuple, List[Dict[str, Any]]] = defaultdict(list)
+    for doc in docs:
+        group_id = evaluate(spec["_id"], doc)
+        key = _sort_key(group_id)
+        groups.setdefault(key, {"_id": group_id})
+        members[key].append(doc)
+
+    for key, result in groups.items():
+        rows = members[key]
+        for field, accumulator in spec.items():
+            if field == "_id":
+                continue
+            (op, expr), = accumulator.items()
+            if op == "$count":
+                result[field] = len(rows)
+                continue
+            values = [evaluate(expr, row) for row in rows]
+            if op == "$sum":
+                result[field] = sum(_numbers(values))
+            elif op == "$avg":
+                numbers = _numbers(values)
+                result[field] = sum(numbers) / len(numbers) if numbers else None
+            elif op in ("$min", "$max"):
+                present = sorted((v for v in values if v is not None), key=_sort_key)
+                result[field] = (present[0] if op == "$min" else present[-1]) if present else None
+            elif op == "$first":
+                result[field] = values[0]
+            elif op == "$last":
+                result[field] = values[-1]
+            elif op == "$push":
+                result[field] = values
+            elif op == "$addToSet":
+                unique: Dict[tuple, Any] = {}
+                for value in values:
+                    unique.setdefault(_sort_key(value), value)
+                result[field] = list(unique.values())
+            else:
+                raise OperationFailure(f"Unsupported accumulator {op} in memory backend")
+    return list(groups.values())
+
+def run_pipeline(docs: List[Dict[str, Any]], pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    for stage in pipeline:
+        (op, spec), = stage.items()
+        if op == "$match":
+            docs = [doc for doc in docs if matches(doc, spec)]
+        elif op == "$group":
+            docs = _group(docs, spec)
+        elif op == "$sort":
+            docs = sort_documents(docs, list(spec.items()))
+        elif op == "$limit":
+            docs = docs[:spec]
+        elif op == "$skip":
+            docs = docs[spec:]
+        elif op == "$project":
+            docs = [project(doc, spec) for doc in docs]
+        elif op in ("$set", "$addFields", "$unset"):
+            docs = [_apply_pipeline(_copy(doc), [stage]) for doc in docs]
+        elif op == "$count":
+            docs = [{spec: len(docs)}] if docs else []
+        elif op == "$unwind":
+            path = (spec if isinstance(spec, str) else spec["path"])[1:]
+            unwound = []
+            for doc in docs:
+                for item in _get(doc, path) or []:
+                    copy = _copy(doc)
+                    _set(copy, path, item)
+                    unwound.append(copy)
+            docs = unwound
+        else:
+            raise OperationFailure(f"Unsupported aggregation stage {op} in memory backend")
+    return docs
+
+# ---------------------------------------------------------------- cursors
+
+class MemoryCursor:
+    """Lazily evaluated find() cursor supporting sort/skip/limit/to_list/async iteration"""
+
+    def __init__(self, collection: "MemoryCollection", query: Optional[Dict[str, Any]], projection: Optional[Dict[str, Any]]):
+        self._collection = collection
+        self._query = query or {}
+        self._projection = projection
+        self._sort: List[Tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+        self._results: Optional[List[Dict[str, Any]]] = None
+
+    def sort(self, key_or_list: Any, direction: Optional[int] = None) -> "MemoryCursor":
+        self._sort = _normalize_sort(key_or_list, direction)
+        return self
+
+    def skip(self, skip: int) -> "MemoryCursor":
+        self._skip = skip
+        return self
+
+    def limit(self, limit: int) -> "MemoryCursor":
+        self._limit = limit
+        return self
+
+    def _evaluate(self) -> List[Dict[str, Any]]:
+        if self._results is None:
+            docs = self._collection._matching(self._query)
+            if self._sort:
+                docs = sort_documents(docs, self._sort)
+            docs = docs[self._skip:]
+            if self._limit:
+                docs = docs[:self._limit]
+            self._results = [project(doc, self._projection) for doc in docs]
+        return self._results
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        results = self._evaluate()
+        taken = results if length is None else results[:length]
+        self._results = results[len(taken):]
+        return taken
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Dict[str, Any]:
+        results = self._evaluate()
+        if not results:
+            raise StopAsyncIteration
+        return results.pop(0)
+
+    def _execution_stats(self, index: Optional[str], bound: List[str], provides_sort: bool) -> Dict[str, Any]:
+        """Documents the chosen plan examines, walking index order and stopping early unless it must sort"""
+        prefix = {field: self._query[field] for field in bound}
+        scanned = [doc for doc in self._collection._docs.values() if matches(doc, prefix)]
+        if provides_sort:
+            scanned = sort_documents(scanned, self._sort)
+        wanted = self._skip + self._limit if self._limit and (provides_sort or not self._sort) else None
+        query = prepare_query(self._query)
+        examined = matched = 0
+        for doc in scanned:
+            examined += 1
+            if matches(doc, query):
+                matched += 1
+                if matched == wanted:
+                    break
+        returned = max(matched - self._skip, 0)
+        return {
+            "executionSuccess": True,
+            "nReturned": min(returned, self._limit) if self._limit else returned,
+            "totalKeysExamined": examined if index else 0,
+            "totalDocsExamined": examined,
+        }
+
+    async def explain(self) -> Dict[str, Any]:
+        name, provides_sort, bound = self._collection._choose_index(self._query, self._sort)
+        plan: Dict[str, Any] = (
+            {"stage": "FETCH", "inputStage": {
+                "stage": "IXSCAN", "indexName": name, "keyPattern": dict(self._collection._indexes[name]["key"])
+            }}
+            if name else {"stage": "COLLSCAN"}
+        )
+        if self._sort and not provides_sort:
+            plan = {"stage": "SORT", "inputStage": plan}
+        return {
+            "queryPlanner": {"namespace": self._collection.full_name, "winningPlan": plan},
+            "executionStats": self._execution_stats(name, bound, provides_sort),
+        }
+
+class MemoryCommandCursor(MemoryCursor):
+    """Cursor over precomputed aggregate() results"""
+
+    def __init__(self, results: List[Dict[str, Any]]):
+        self._results = results
+
+# ---------------------------------------------------------------- collections
+
+def _index_name(keys: List[Tuple[str, Any]]) -> str:
+    return "_".join(f"{field}_{direction}" for field, direction in keys)
+
+class MemoryCollection:
+    def __init__(self, database: "MemoryDatabase", name: str):
+        self.database = database
+        self.name = name
+        self.full_name = f"{database.name}.{name}"
+        self._docs: Dict[tuple, Dict[str, Any]] = {}
+        # insertion sequence per document, i.e. natural order
+        self._order: Dict[tuple, int] = {}
+        self._indexes: Dict[str, Dict[str, Any]] = {"_id_": {"key": [("_id", 1)], "unique": True}}
+        # field -> value key -> document keys, for the leading field of each index
+        self._hashed: Dict[str, Dict[tuple, Set[tuple]]] = {}
+        # unique index name -> index key -> document key
+        self._unique: Dict[str, Dict[tuple, tuple]] = {}
+
+    # ----- indexes
+
+    async def create_index(self, keys: Any, **kwargs) -> str:
+        keys = _normalize_sort(keys)
+        name = kwargs.get("name") or _index_name(keys)
+        spec = {"key": keys}
+        if kwargs.get("unique"):
+            spec["unique"] = True
+        if kwargs.get("partialFilterExpression"):
+            spec["partialFilterExpression"] = kwargs["partialFilterExpression"]
+        existing = self._indexes.get(name)
+        if existing is not None:
+            if existing != spec:
+                raise OperationFailure(f"An existing index has the same name as the requested index: {name}", 85)
+            return name
+
+        field = keys[0][0]
+        if field not in self._hashed:
+            self._hashed[field] = defaultdict(set)
+            for doc_key, doc in self._docs.items():
+                self._hash_add(field, doc_key, doc)
+        if spec.get("unique"):
+            entries: Dict[tuple, tuple] = {}
+            for doc_key, doc in self._docs.items():
+                unique_key = self._unique_key(spec, doc)
+                if unique_key is None:
+                    continue
+                if unique_key in entries:
+                    raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.full_name} index: {name}", 11000)
+                entries[unique_key] = doc_key
+            self._unique[name] = entries
+        self._indexes[name] = spec
+        return name
+
+    async def create_indexes(self, indexes: List[Any]) -> List[str]:
+        return [await self.create_index(index.document["key"].items(), **{
+            k: v for k, v in index.document.items() if k != "key"
+        }) for index in indexes]
+
+    async def drop_index(self, name: str):
+        if name not in self._indexes or name == "_id_":
+            raise OperationFailure(f"index not found with name [{name}]", 27)
+        del self._indexes[name]
+        self._unique.pop(name, None)
+        leading = {spec["key"][0][0] for spec in self._indexes.values()}
+        for field in list(self._hashed):
+            if field not in leading:
+                del self._hashed[field]
+
+    async def index_information(self) -> Dict[str, Dict[str, Any]]:
+        return {name: dict(spec) for name, spec in self._indexes.items()}
+
+    def _unique_key(self, spec: Dict[str, Any], doc: Dict[str, Any]) -> Optional[tuple]:
+        partial = spec.get("partialFilterExpression")
+        if partial and not matches(doc, partial):
+            return None
+        return tuple(_sort_key(_get(doc, field)) for field, _ in spec["key"])
+
+    def _hash_keys(self, doc: Dict[str, Any], field: str) -> List[tuple]:
+        value = _get(doc, field)
+        keys = [_sort_key(value)]
+        if isinstance(value, list):
+            keys.extend(_sort_key(item) for item in value)
+        return keys
+
+    def _hash_add(self, field: str, doc_key: tuple, doc: Dict[str, Any]):
+        for key in self._hash_keys(doc, field):
+            self._hashed[field][key].add(doc_key)
+
+    def _index_add(self, doc_key: tuple, doc: Dict[str, Any]):
+        for field in self._hashed:
+            self._hash_add(field, doc_key, doc)
+        for name, entries in self._unique.items():
+            unique_key = self._unique_key(self._indexes[name], doc)
+            if unique_key is not None:
+                entries[unique_key] = doc_key
+
+    def _index_remove(self, doc_key: tuple, doc: Dict[str, Any]):
+        for field, buckets in self._hashed.items():
+            for key in self._hash_keys(doc, field):
+                bucket = buckets.get(key)
+                if bucket is not None:
+                    bucket.discard(doc_key)
+                    if not bucket:
+                        del buckets[key]
+        for name, entries in self._unique.items():
+            unique_key = self._unique_key(self._indexes[name], doc)
+            if unique_key is not None and entries.get(unique_key) == doc_key:
+                del entries[unique_key]
+
+    def _check_unique(self, doc: Dict[str, Any], doc_key: Optional[tuple] = None):
+        for name, entries in self._unique.items():
+            unique_key = self._unique_key(self._indexes[name], doc)
+            if unique_key is None:
+                continue
+            owner = entries.get(unique_key)
+            if owner is not None and owner != doc_key:
+                raise DuplicateKeyError(
+                    f"E11000 duplicate key error collection: {self.full_name} index: {name}", 11000
+                )
+
+    # ----- reads
+
+    def _equality_keys(self, cond: Any) -> Optional[List[tuple]]:
+        """Hash keys a condition can only match, or None if it is not an equality/$in test"""
+        if isinstance(cond, dict) and cond and all(key.startswith("$") for key in cond):
+            if "$eq" in cond:
+                return [_sort_key(cond["$eq"])]
+            if "$in" in cond and not any(isinstance(item, re.Pattern) for item in cond["$in"]):
+                return [_sort_key(item) for item in cond["$in"]]
+            return None
+        if isinstance(cond, re.Pattern):
+            return None
+        return [_sort_key(cond)]
+
+    def _index_candidates(self, query: Dict[str, Any]) -> Tuple[Optional[str], Optional[Set[tuple]]]:
+        best: Tuple[Optional[str], Optional[Set[tuple]]] = (None, None)
+        for field, cond in query.items():
+            if field == "$and":
+                for clause in cond:
+                    found = self._index_candidates(clause)
+                    if found[1] is not None and (best[1] is None or len(found[1]) < len(best[1])):
+                        best = found
+                continue
+            if field not in self._hashed:
+                continue
+            keys = self._equality_keys(cond)
+            if keys is None:
+                continue
+            buckets = self._hashed[field]
+            candidates: Set[tuple] = set()
+            for key in keys:
+                candidates |= buckets.get(key, set())
+            if best[1] is None or len(candidates) < len(best[1]):
+                best = (field, candidates)
+        return best
+
+    def _choose_index(self, query: Dict[str, Any], sort: List[Tuple[str, int]]) -> Tuple[Optional[str], bool, List[str]]:
+        """(name, provides sort, equality-bound fields) of the index MongoDB would plan a find with; no name for a scan"""
+        # Usable when the leading fields are equality-bound or the following keys give the sort; prefer avoiding a sort
+        best: Tuple[Optional[str], bool, List[str]] = (None, False, [])
+        best_score = (False, 0)
+        for name, spec in self._indexes.items():
+            partial = spec.get("partialFilterExpression", {})
+            if any(not _equal(query.get(field, _MISSING), value) for field, value in partial.items()):
+                continue
+            keys = spec["key"]
+            prefix = 0
+            while prefix < len(keys) and keys[prefix][0] in query and self._equality_keys(query[keys[prefix][0]]) is not None:
+                prefix += 1
+            # Sort fields fixed by the equality prefix do not need ordering
+            bound = [field for field, _ in keys[:prefix]]
+            order = [(field, direction) for field, direction in sort if field not in bound]
+            following = keys[prefix:prefix + len(order)]
+            provides_sort = bool(sort) and following in (order, [(field, -direction) for field, direction in order])
+            if not prefix and not provides_sort:
+                continue
+            score = (provides_sort or not sort, prefix)
+            if score > best_score:
+                best, best_score = (name, provides_sort, bound), score
+        return best
+
+    def _matching_keys(self, query: Dict[str, Any]) -> List[tuple]:
+        _, candidates = self._index_candidates(query)
+        if candidates is None:
+            keys: Iterable[tuple] = self._docs.keys()
+        else:
+            # Keep natural (insertion) order like a collection scan would
+            keys = sorted(candidates, key=self._order.__getitem__) if len(candidates) > 1 else candidates
+        query = prepare_query(query)
+        return [key for key in keys if matches(self._docs[key], query)]
+
+    def _matching(self, query: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Stored documents matching a filter; callers copy before handing them out"""
+        return [self._docs[key] for key in self._matching_keys(query)]
+
+    def find(self, filter: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None, **kwargs) -> MemoryCursor:
+        cursor = MemoryCursor(self, filter, projection or kwargs.get("projection"))
+        if kwargs.get("sort"):
+            cursor.sort(kwargs["sort"])
+        if kwargs.get("limit"):
+            cursor.limit(kwargs["limit"])
+        return cursor
+
+    async def find_one(self, filter: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None, **kwargs) -> Optional[Dict[str, Any]]:
+        results = await self.find(filter, projection, **kwargs).limit(1).to_list(1)
+        return results[0] if results else None
+
+    async def count_documents(self, filter: Dict[str, Any], **kwargs) -> int:
+        return len(self._matching_keys(filter))
+
+    async def estimated_document_count(self, **kwargs) -> int:
+        return len(self._docs)
+
+    async def distinct(self, key: str, filter: Optional[Dict[str, Any]] = None, **kwargs) -> List[Any]:
+        values: Dict[tuple, Any] = {}
+        for doc_key in self._matching_keys(filter or {}):
+            for value in _lookup(self._docs[doc_key], key.split(".")):
+                for item in value if isinstance(value, list) else [value]:
+                    values.setdefault(_sort_key(item), _copy(item))
+        return [values[key] for key in sorted(values)]
+
+    def aggregate(self, pipeline: List[Dict[str, Any]], **kwargs) -> MemoryCommandCursor:
+        pipeline = list(pipeline)
+        # A leading $match can use the hash indexes
+        query = pipeline.pop(0)["$match"] if pipeline and "$match" in pipeline[0] else {}
+        docs = self._matching(query)
+        return MemoryCommandCursor([_copy(doc) for doc in run_pipeline(docs, pipeline)])
+
+    # ----- writes
+
+    def _insert(self, doc: Dict[str, Any]) -> Any:
+        doc = _to_bson(doc)
+        doc.setdefault("_id", ObjectId())
+        doc_key = _sort_key(doc["_id"])
+        if doc_key in self._docs:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.full_name} index: _id_", 11000)
+        self._check_unique(doc)
+        self._order[doc_key] = self.database.client._next_seq()
+        self._docs[doc_key] = doc
+        self._index_add(doc_key, doc)
+        return doc["_id"]
+
+    def _replace_stored(self, doc_key: tuple, old: Dict[str, Any], new: Dict[str, Any]):
+        self._check_unique(new, doc_key)
+        self._index_remove(doc_key, old)
+        self._docs[doc_key] = new
+        self._index_add(doc_key, new)
+
+    def _update_doc(self, doc_key: tuple, update: Any, replacement: bool = False) -> bool:
+        old = self._docs[doc_key]
+        if replacement:
+            new = _to_bson(update)
+            new["_id"] = old["_id"]
+        else:
+            new = apply_update(_copy(old), update)
+            if not _equal(new.get("_id"), old["_id"]):
+                raise OperationFailure("Performing an update on the path '_id' would modify the immutable field '_id'", 66)
+        if new == old:
+            return False
+        self._replace_stored(doc_key, old, new)
+        return True
+
+    def _upsert(self, filter: Dict[str, Any], update: Any, replacement: bool = False) -> Any:
+        if replacement:
+            doc = _to_bson(update)
+            if "_id" in filter and "_id" not in doc:
+                doc["_id"] = filter["_id"]
+        else:
+            doc = apply_update(_upsert_seed(filter), update, inserting=True)
+        return self._insert(doc)
+
+    def _write(self, filter: Dict[str, Any], update: Any, upsert: bool, multi: bool, replacement: bool = False) -> Dict[str, Any]:
+        keys = self._matching_keys(filter)
+        if not multi:
+            keys = keys[:1]
+        if not keys:
+            if upsert:
+                return {"n": 1, "nModified": 0, "upserted": self._upsert(filter, update, replacement)}
+            return {"n": 0, "nModified": 0}
+        modified = sum(1 for key in keys if self._update_doc(key, update, replacement))
+        return {"n": len(keys), "nModified": modified}
+
+    async def insert_one(self, document: Dict[str, Any], **kwargs) -> InsertOneResult:
+        inserted_id = self._insert(document)
+        document.setdefault("_id", inserted_id)
+        return InsertOneResult(inserted_id, True)
+
+    async def insert_many(self, documents: Iterable[Dict[str, Any]], ordered: bool = True, **kwargs) -> InsertManyResult:
+        documents = list(documents)
+        for document in documents:
+            document.setdefault("_id", ObjectId())
+        await self.bulk_write([InsertOne(doc) for doc in documents], ordered=ordered)
+        return InsertManyResult([doc["_id"] for doc in documents], True)
+
+    async def update_one(self, filter: Dict[str, Any], update: Any, upsert: bool = False, **kwargs) -> UpdateResult:
+        return UpdateResult(self._write(filter, update, upsert, multi=False), True)
+
+    async def update_many(self, filter: Dict[str, Any], update: Any, upsert: bool = False, **kwargs) -> UpdateResult:
+        return UpdateResult(self._write(filter, update, upsert, multi=True), True)
+
+    async def replace_one(self, filter: Dict[str, Any], replacement: Dict[str, Any], upsert: bool = False, **kwargs) -> UpdateResult:
+        return UpdateResult(self._write(filter, replacement, upsert, multi=False, replacement=True), True)
+
+    async def delete_one(self, filter: Dict[str, Any], **kwargs) -> DeleteResult:
+        return DeleteResult({"n": self._delete(filter, multi=False)}, True)
+
+    async def delete_many(self, filter: Dict[str, Any], **kwargs) -> DeleteResult:
+        return DeleteResult({"n": self._delete(filter, multi=True)}, True)
+
+    def _delete(self, filter: Dict[str, Any], multi: bool) -> int:
+        keys = self._matching_keys(filter)
+        if not multi:
+            keys = keys[:1]
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def _remove(self, doc_key: tuple) -> Dict[str, Any]:
+        doc = self._docs.pop(doc_key)
+        del self._order[doc_key]
+        self._index_remove(doc_key, doc)
+        return doc
+
+    async def find_one_and_update(
+        self,
+        filter: Dict[str, Any],
+        update: Any,
+        projection: Optional[Dict[str, Any]] = None,
+        sort: Optional[Any] = None,
+        upsert: bool = False,
+        return_document: bool = False,
+        **kwargs
+    ) -> Optional[Dict[str, Any]]:
+        keys = self._matching_keys(filter)
+        if sort and keys:
+            docs = sort_documents([self._docs[key] for key in keys], _normalize_sort(sort))
+            keys = [_sort_key(docs[0]["_id"])]
+        if not keys:
+            if not upsert:
+                return None
+            inserted_id = self._upsert(filter, update)
+            if not return_document:
+                return None
+            return project(self._docs[_sort_key(inserted_id)], projection)
+        key = keys[0]
+        # Updates store a new dict, so the old one is a stable pre-image
+        before = self._docs[key]
+        self._update_doc(key, update)
+        return project(self._docs[key] if return_document else before, projection)
+
+    async def find_one_and_delete(self, filter: Dict[str, Any], projection: Optional[Dict[str, Any]] = None, **kwargs):
+        keys = self._matching_keys(filter)
+        if not keys:
+            return None
+        doc = self._remove(keys[0])
+        return project(doc, projection)
+
+    async def bulk_write(self, requests: List[Any], ordered: bool = True, **kwargs) -> BulkWriteResult:
+        counts = {"nInserted": 0, "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": []}
+        errors = []
+        for index, request in enumerate(requests):
+            try:
+                if isinstance(request, InsertOne):
+                    request._doc.setdefault("_id", ObjectId())
+                    self._insert(request._doc)
+                    counts["nInserted"] += 1
+                elif isinstance(request, (UpdateOne, UpdateMany, ReplaceOne)):
+                    raw = self._write(
+                        request._filter, request._doc, request._upsert,
+                        multi=isinstance(request, UpdateMany), replacement=isinstance(request, ReplaceOne)
+                    )
+                    if "upserted" in raw:
+                        counts["nUpserted"] += 1
+                        counts["upserted"].append({"index": index, "_id": raw["upserted"]})
+                    else:
+                        counts["nMatched"] += raw["n"]
+                        counts["nModified"] += raw["nModified"]
+                elif isinstance(request, (DeleteOne, DeleteMany)):
+                    counts["nRemoved"] += self._delete(request._filter, multi=isinstance(request, DeleteMany))
+                else:
+                    raise TypeError(f"{request!r} is not a valid request")
+            except OperationFailure as e:
+                errors.append({"index": index, "code": e.code, "errmsg": str(e), "op": getattr(request, "_doc", None)})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({**counts, "writeErrors": errors, "writeConcernErrors": []})
+        return BulkWriteResult(counts, True)
+
+    async def drop(self):
+        self._docs.clear()
+        self._order.clear()
+        self._indexes = {"_id_": {"key": [("_id", 1)], "unique": True}}
+        self._hashed.clear()
+        self._unique.clear()
+
+class MemoryDatabase:
+    def __init__(self, client: "MemoryClient", name: str):
+        self.client = client
+        self.name = name
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection(self, name)
+        return self._collections[name]
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def get_collection(self, name: str, **kwargs) -> MemoryCollection:
+        return self[name]
+
+    async def list_collection_names(self, **kwargs) -> List[str]:
+        return list(self._collections)
+
+    async def drop_collection(self, name: str):
+        self._collections.pop(name, None)
+
+    async def command(self, command: Any, **kwargs) -> Dict[str, Any]:
+        name = command if isinstance(command, str) else next(iter(command))
+        if name in ("ping", "isMaster", "hello", "buildInfo"):
+            return {"ok": 1.0}
+        raise OperationFailure(f"Command {name} is not supported by the memory backend", 59)
+
+class MemoryClient:
+    """Stand-in for AsyncIOMotorClient holding all data in process memory"""
+
+    def __init__(self, *args, **kwargs):
+        self._databases: Dict[str, MemoryDatabase] = {}
+        self._seq = 0
+
+    def _next_seq(self) -> int:
+        self._seq += 1
+        return self._seq
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        if name not in self._databases:
+            self._databases[name] = MemoryDatabase(self, name)
+        return self._databases[name]
+
+    def __getattr__(self, name: str) -> MemoryDatabase:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def get_database(self, name: str, **kwargs) -> MemoryDatabase:
+        return self[name]
+
+    async def drop_database(self, name: str):
+        self._databases.pop(name, None)
+
+    def close(self):
+        pass
@@ -0,0 +1,237 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import math
+import threading
+import time
+
+from pymongo import monitoring
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}")
+        return lines
+
+class Gauge(Counter):
+    def dec(self, labels: Tuple[str, ...] = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+    def set(self, labels: Tuple[str, ...], value: float):
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name, self.help, self.labels = name, help, labels
+        self.buckets = tuple(buckets) + (math.inf,)
+        # label values -> [per-bucket counts..., sum, count]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    le = f'le="{_format_value(bound)}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {_format_value(series[-2])}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {series[-1]}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[Any] = []
+        # Called at scrape time to refresh gauges from other components' stats
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            collector()
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+requests_total = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+))
+request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+))
+requests_in_progress = registry.register(Gauge(
+    "http_requests_in_progress", "HTTP requests currently being served"
+))
+dependency_duration = registry.register(Histogram(
+    "dependency_call_duration_seconds", "Latency of MongoDB, LLM and bcrypt calls", ("dependency", "operation")
+))
+dependency_errors = registry.register(Counter(
+    "dependency_call_errors_total", "Failed MongoDB, LLM and bcrypt calls", ("dependency", "operation")
+))
+request_dependency_duration = registry.register(Histogram(
+    "http_request_dependency_seconds", "Time a request spent in each dependency", ("route", "dependency")
+))
+request_dependency_calls = registry.register(Histogram(
+    "http_request_dependency_calls", "Dependency calls made per request", ("route", "dependency"),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100)
+))
+
+class RequestTimings:
+    """Dependency time and call counts accumulated for one request (may be updated from worker threads)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.totals: Dict[str, List[float]] = {}
+
+    def add(self, dependency: str, seconds: float):
+        with self._lock:
+            total = self.totals.setdefault(dependency, [0.0, 0])
+            total[0] += seconds
+            total[1] += 1
+
+_current_request: ContextVar[Optional[RequestTimings]] = ContextVar("current_request", default=None)
+
+def record_dependency(dependency: str, operation: str, seconds: float, failed: bool = False):
+    dependency_duration.observe((dependency, operation), seconds)
+    if failed:
+        dependency_errors.inc((dependency, operation))
+    timings = _current_request.get()
+    if timings is not None:
+        timings.add(dependency, seconds)
+
+@contextmanager
+def timed(dependency: str, operation: str) -> Iterator[None]:
+    """Time a block (sync or around awaits) as a dependency call"""
+    started = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        record_dependency(dependency, operation, time.perf_counter() - started, failed)
+
+def timed_call(dependency: str, operation: str, func: Callable, *args):
+    with timed(dependency, operation):
+        return func(*args)
+
+class CommandMetrics(monitoring.CommandListener):
+    """Records the duration of every MongoDB command, labelled collection.command"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[Any, int], str] = {}
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        if not isinstance(target, str):
+            target = event.command.get("collection", "")
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = f"{target}.{event.command_name}" if target else event.command_name
+
+    def _finish(self, event, failed: bool):
+        with self._lock:
+            operation = self._pending.pop((event.connection_id, event.request_id), event.command_name)
+        record_dependency("mongo", operation, event.duration_micros / 1_000_000, failed)
+
+    def succeeded(self, event):
+        self._finish(event, False)
+
+    def failed(self, event):
+        self._finish(event, True)
+
+command_metrics = CommandMetrics()
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency and the dependency time attributed to each request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        timings = RequestTimings()
+        token = _current_request.set(timings)
+        requests_in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            requests_in_progress.dec()
+            _current_request.reset(token)
+            # The router stores the matched route in the scope; unmatched paths share one label
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            requests_total.inc((scope["method"], route, str(status)))
+            request_duration.observe((scope["method"], route), elapsed)
+            for dependency, (seconds, calls) in timings.totals.items():
+                request_dependency_duration.observe((route, dependency), seconds)
+                request_dependency_calls.observe((route, dependency), calls)
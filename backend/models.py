@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional, Dict, Any
+from typing import Annotated, List, Optional, Dict, Any
 from datetime import datetime
 from enum import Enum
 import uuid
@@ -71,6 +71,7 @@ class Book(BookBase):
     uploaded_by: str  # user_id
     created_at: datetime = Field(default_factory=datetime.utcnow)
     approved: bool = False
+    rejected: bool = False
 
 class VideoBase(BaseModel):
     title: str
@@ -93,12 +94,28 @@ class Video(VideoBase):
     uploaded_by: str
     created_at: datetime = Field(default_factory=datetime.utcnow)
     approved: bool = False
+    rejected: bool = False
+
+# Moderation Models
+class ModerationAction(str, Enum):
+    APPROVE = "approve"
+    REJECT = "reject"
+
+class ModerationDecision(BaseModel):
+    content_type: str  # 'books' or 'videos'
+    ids: List[str]
+    action: ModerationAction
+    reason: Optional[str] = None
 
 # Quiz Models
+# Option indexes must fit the int8 answer keys used for grading; -1 marks an unanswered question
+OptionIndex = Annotated[int, Field(ge=0, le=127)]
+AnswerIndex = Annotated[int, Field(ge=-1, le=127)]
+
 class QuizQuestion(BaseModel):
     question: str
     options: List[str]  # 4 options
-    correct_answer: int  # index of correct option (0-3)
+    correct_answer: OptionIndex  # index of correct option (0-3)
     explanation: str
 
 class QuizBase(BaseModel):
@@ -118,6 +135,19 @@ class Quiz(QuizBase):
     created_by: str
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+class QuizSummary(BaseModel):
+    """Quiz listing entry without the question bodies"""
+    id: str
+    title: str
+    stream: Stream
+    class_level: int
+    subject: str
+    topic: str
+    difficulty: DifficultyLevel
+    question_count: int = 0
+    created_by: str
+    created_at: datetime
+
 class QuizAttempt(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     quiz_id: str
@@ -126,6 +156,14 @@ class QuizAttempt(BaseModel):
     score: float
     completed_at: datetime = Field(default_factory=datetime.utcnow)
 
+class QuizAttemptSubmission(BaseModel):
+    quiz_id: str
+    answers: List[AnswerIndex]
+    completed_at: Optional[datetime] = None  # when the attempt was taken, for offline sync
+
+class QuizAttemptBatch(BaseModel):
+    attempts: List[QuizAttemptSubmission]
+
 # Chat Models
 class ChatMessage(BaseModel):
     role: str  # 'user' or 'assistant'
@@ -138,9 +176,21 @@ class ChatSession(BaseModel):
     topic: Optional[str] = None
     subject: Optional[str] = None
     messages: List[ChatMessage] = []
+    message_count: int = 0
+    summary: Optional[str] = None  # rolling summary of turns older than the context window
+    summarized_count: int = 0
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
+class ChatSessionHeader(BaseModel):
+    id: str
+    user_id: str
+    topic: Optional[str] = None
+    subject: Optional[str] = None
+    message_count: int = 0
+    created_at: datetime
+    updated_at: datetime
+
 class ChatRequest(BaseModel):
     message: str
     session_id: Optional[str] = None
@@ -0,0 +1,83 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import base64
+import json
+
+MAX_PAGE_SIZE = 500
+
+# Stable orderings used by the paginated listings; the last field must be unique
+CREATED_ORDER = [("created_at", -1), ("id", -1)]
+UPDATED_ORDER = [("updated_at", -1), ("id", -1)]
+TOPIC_ORDER = [("subject", 1), ("topic", 1)]
+
+class InvalidCursor(ValueError):
+    pass
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    return value
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "$date" in value:
+        return datetime.fromisoformat(value["$date"])
+    return value
+
+def encode_cursor(payload: Dict[str, Any]) -> str:
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Decode an opaque cursor, raising InvalidCursor if it was tampered with"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except (ValueError, TypeError):
+        raise InvalidCursor("Invalid cursor")
+    if not isinstance(payload, dict):
+        raise InvalidCursor("Invalid cursor")
+    return payload
+
+def keyset_filter(sort: List[Tuple[str, int]], values: List[Any]) -> Dict[str, Any]:
+    """Filter matching documents that come strictly after `values` in the sort order"""
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {prev_field: values[j] for j, (prev_field, _) in enumerate(sort[:i])}
+        clause[field] = {"$gt" if direction > 0 else "$lt": values[i]}
+        clauses.append(clause)
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+async def paginate(
+    collection,
+    query: Dict[str, Any],
+    sort: List[Tuple[str, int]],
+    limit: int,
+    cursor: Optional[str] = None,
+    projection: Optional[Dict[str, Any]] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Fetch one page in keyset order; returns (docs, next_cursor)"""
+    if cursor:
+        values = decode_cursor(cursor).get("after")
+        if not isinstance(values, list) or len(values) != len(sort):
+            raise InvalidCursor("Invalid cursor")
+        query = {"$and": [query, keyset_filter(sort, [_decode_value(v) for v in values])]}
+
+    docs = await collection.find(query, projection).sort(sort).limit(limit + 1).to_list(limit + 1)
+    if len(docs) <= limit:
+        return docs, None
+
+    docs = docs[:limit]
+    last = docs[-1]
+    return docs, encode_cursor({"after": [_encode_value(last.get(field)) for field, _ in sort]})
+
+def page_offset(cursor: Optional[str]) -> int:
+    """Offset into a ranked result list (search results page by rank position)"""
+    if not cursor:
+        return 0
+    offset = decode_cursor(cursor).get("offset")
+    if not isinstance(offset, int) or offset < 0:
+        raise InvalidCursor("Invalid cursor")
+    return offset
+
+def offset_cursor(offset: int, total: int) -> Optional[str]:
+    return encode_cursor({"offset": offset}) if offset < total else None
@@ -0,0 +1,134 @@
+from collections import Counter
+from typing import Any, Dict, List
+import asyncio
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+
+# Leaf frames of threads that are blocked rather than doing work
+_IDLE_LEAVES = {
+    ("selectors.py", "select"), ("threading.py", "wait"), ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"), ("thread.py", "_worker"),
+}
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+_capture_lock = threading.Lock()
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def _is_idle(frame) -> bool:
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES
+
+def _sample_stacks(duration: float, interval: float, include_idle: bool) -> Dict[str, Any]:
+    """Sample all threads' stacks until duration elapses; returns collapsed stack counts"""
+    own_id = threading.get_ident()
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    stacks: Counter = Counter()
+    samples = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id or (not include_idle and _is_idle(frame)):
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            if thread_id not in names:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            labels.append(names.get(thread_id, str(thread_id)))
+            stacks[";".join(reversed(labels))] += 1
+        samples += 1
+        time.sleep(interval)
+    return {"samples": samples, "stacks": stacks}
+
+def collapse(stacks: Counter) -> str:
+    """Render stack counts in collapsed format: 'root;child;leaf count' per line"""
+    return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()) + "\n"
+
+async def sample_stacks(duration: float, interval: float = 0.01, include_idle: bool = False) -> Dict[str, Any]:
+    """Run the stack sampler in a background thread while the event loop keeps serving"""
+    if not _capture_lock.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already being captured")
+    try:
+        return await asyncio.to_thread(_sample_stacks, min(duration, PROFILE_MAX_SECONDS), interval, include_idle)
+    finally:
+        _capture_lock.release()
+
+async def profile_event_loop(duration: float, limit: int = 50, sort: str = "cumulative") -> List[Dict[str, Any]]:
+    """cProfile the event loop thread for duration seconds; returns the top functions"""
+    if not _capture_lock.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already being captured")
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+        try:
+            await asyncio.sleep(min(duration, PROFILE_MAX_SECONDS))
+        finally:
+            profiler.disable()
+    finally:
+        _capture_lock.release()
+
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, function), (_, calls, total_time, cumulative_time, _) in stats.stats.items():
+        rows.append({
+            "function": f"{function} ({os.path.basename(filename)}:{line})",
+            "calls": calls,
+            "total_seconds": round(total_time, 6),
+            "cumulative_seconds": round(cumulative_time, 6),
+        })
+    key = "total_seconds" if sort == "tottime" else "cumulative_seconds"
+    rows.sort(key=lambda row: row[key], reverse=True)
+    return rows[:limit]
+
+async def allocation_growth(duration: float, limit: int = 25, frames: int = 1) -> Dict[str, Any]:
+    """Top source lines by memory allocated (and still held) during the capture window"""
+    if not _capture_lock.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already being captured")
+    started_here = not tracemalloc.is_tracing()
+    try:
+        if started_here:
+            tracemalloc.start(frames)
+        before = await asyncio.to_thread(tracemalloc.take_snapshot)
+        await asyncio.sleep(min(duration, PROFILE_MAX_SECONDS))
+        after = await asyncio.to_thread(tracemalloc.take_snapshot)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        if started_here:
+            tracemalloc.stop()
+        _capture_lock.release()
+
+    key_type = "traceback" if frames > 1 else "lineno"
+    snapshot_filters = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ]
+    diff = after.filter_traces(snapshot_filters).compare_to(before.filter_traces(snapshot_filters), key_type)
+    sites = []
+    for stat in diff[:limit]:
+        sites.append({
+            "site": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+            "size_kb": round(stat.size / 1024, 1),
+            "size_diff_kb": round(stat.size_diff / 1024, 1),
+            "count": stat.count,
+            "count_diff": stat.count_diff,
+        })
+    return {
+        "traced_current_kb": round(current / 1024, 1),
+        "traced_peak_kb": round(peak / 1024, 1),
+        "started_tracing": started_here,
+        "sites": sites,
+    }
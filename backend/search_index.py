@@ -0,0 +1,171 @@
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import math
+import os
+import re
+import uuid
+
+SEARCH_CANDIDATE_LIMIT = int(os.getenv("SEARCH_CANDIDATE_LIMIT", "1000"))
+# Taxonomy fields listings filter on; fixed once content is created, so they can be filtered in the index
+FILTER_FIELDS = ("stream", "class_level", "subject", "topic")
+SEARCH_INDEX_REFRESH_SECONDS = float(os.getenv("SEARCH_INDEX_REFRESH_SECONDS", "30"))
+
+_TOKEN = re.compile(r"\w+")
+
+def tokenize(text: Any) -> List[str]:
+    """Lowercase word tokens of a string or list of strings"""
+    if not text:
+        return []
+    if isinstance(text, (list, tuple)):
+        return [token for item in text for token in tokenize(item)]
+    return _TOKEN.findall(str(text).lower())
+
+class SearchIndex:
+    """In-process inverted index with prefix matching and BM25-style ranking"""
+
+    def __init__(self, fields: Dict[str, float]):
+        self.fields = fields
+        self._postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._doc_terms: Dict[str, Set[str]] = {}
+        self._doc_lengths: Dict[str, float] = {}
+        self._doc_filters: Dict[str, Dict[str, Any]] = {}
+        self._total_length = 0.0
+        self._terms: List[str] = []
+        self.latest_created_at: Optional[datetime] = None
+        # Changes on every add/remove; unique per process since each worker indexes on its own schedule
+        self._instance = uuid.uuid4().hex[:12]
+        self._changes = 0
+
+    @property
+    def generation(self) -> str:
+        """Identifies this index's current contents, for keying cached search results"""
+        return f"{self._instance}:{self._changes}"
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def add(self, doc: Dict[str, Any]):
+        """Index a document, replacing any previous version with the same id"""
+        doc_id = doc["id"]
+        weights: Dict[str, float] = defaultdict(float)
+        for field, weight in self.fields.items():
+            for token in tokenize(doc.get(field)):
+                weights[token] += weight
+        filters = {field: getattr(doc.get(field), "value", doc.get(field)) for field in FILTER_FIELDS}
+        if self._doc_filters.get(doc_id) == filters and self._doc_terms.get(doc_id) == set(weights) and all(
+            self._postings[term][doc_id] == weight for term, weight in weights.items()
+        ):
+            # Refreshes re-read the newest documents; an unchanged one is not a change
+            self._track_created_at(doc)
+            return
+
+        self.remove(doc_id)
+        if not weights:
+            return
+        self._changes += 1
+
+        for term, weight in weights.items():
+            if term not in self._postings:
+                insort(self._terms, term)
+            self._postings[term][doc_id] = weight
+        length = sum(weights.values())
+        self._doc_terms[doc_id] = set(weights)
+        self._doc_lengths[doc_id] = length
+        self._doc_filters[doc_id] = filters
+        self._total_length += length
+        self._track_created_at(doc)
+
+    def _track_created_at(self, doc: Dict[str, Any]):
+        created_at = doc.get("created_at")
+        if isinstance(created_at, datetime) and (self.latest_created_at is None or created_at > self.latest_created_at):
+            self.latest_created_at = created_at
+
+    def add_many(self, docs: Iterable[Dict[str, Any]]):
+        for doc in docs:
+            self.add(doc)
+
+    def remove(self, doc_id: str):
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        self._changes += 1
+        self._total_length -= self._doc_lengths.pop(doc_id)
+        del self._doc_filters[doc_id]
+        for term in terms:
+            postings = self._postings[term]
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[term]
+                del self._terms[bisect_left(self._terms, term)]
+
+    def _expand(self, token: str) -> List[str]:
+        """Indexed terms starting with token"""
+        start = bisect_left(self._terms, token)
+        end = bisect_left(self._terms, token + "\uffff", lo=start)
+        return self._terms[start:end]
+
+    def _matches(self, doc_id: str, filters: Dict[str, Any]) -> bool:
+        values = self._doc_filters[doc_id]
+        return all(values[field] == value for field, value in filters.items())
+
+    def search(
+        self, query: str, filters: Optional[Dict[str, Any]] = None, limit: Optional[int] = None
+    ) -> List[Tuple[str, float]]:
+        """Return (doc_id, score) pairs for documents matching every query term and the filters, best first"""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or not self._doc_terms:
+            return []
+
+        doc_count = len(self._doc_terms)
+        avg_length = self._total_length / doc_count
+        scores: Optional[Dict[str, float]] = None
+        # Match the rarest terms first so the candidate set shrinks quickly
+        expansions = sorted(
+            ((token, self._expand(token)) for token in tokens),
+            key=lambda item: sum(len(self._postings[t]) for t in item[1])
+        )
+        for token, terms in expansions:
+            token_scores: Dict[str, float] = {}
+            for term in terms:
+                postings = self._postings[term]
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                boost = 1.0 if term == token else 0.5
+                for doc_id, tf in postings.items():
+                    if scores is not None and doc_id not in scores:
+                        continue
+                    norm = tf * 2.2 / (tf + 1.2 * (0.25 + 0.75 * self._doc_lengths[doc_id] / avg_length))
+                    token_scores[doc_id] = max(token_scores.get(doc_id, 0.0), idf * norm * boost)
+            if scores is None:
+                scores = token_scores
+                if filters:
+                    scores = {doc_id: score for doc_id, score in scores.items() if self._matches(doc_id, filters)}
+            else:
+                scores = {doc_id: scores[doc_id] + score for doc_id, score in token_scores.items()}
+            if not scores:
+                return []
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:limit] if limit is not None else ranked
+
+    async def load(self, collection, projection: Optional[Dict[str, int]] = None, since: Optional[datetime] = None) -> int:
+        """Index documents from a collection, optionally only those created after `since`"""
+        projection = projection or {field: 1 for field in self.fields}
+        projection.update({"_id": 0, "id": 1, "created_at": 1, **{field: 1 for field in FILTER_FIELDS}})
+        query = {"created_at": {"$gte": since}} if since else {}
+        count = 0
+        async for doc in collection.find(query, projection):
+            self.add(doc)
+            count += 1
+        return count
+
+    async def refresh(self, collection) -> int:
+        """Pick up documents inserted by other workers since the newest indexed one"""
+        return await self.load(collection, since=self.latest_created_at)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"documents": len(self._doc_terms), "terms": len(self._terms)}
+
+books_index = SearchIndex({"title": 3.0, "author": 2.0, "tags": 2.0})
+videos_index = SearchIndex({"title": 3.0, "teacher_name": 2.0, "tags": 2.0})
@@ -3,19 +3,13 @@ Script to seed the database with mock data
 Run this after starting the server: python seed_data.py
 """
 import asyncio
-from motor.motor_asyncio import AsyncIOMotorClient
 from models import *
 from auth import get_password_hash
-import os
-from dotenv import load_dotenv
+from database import db, close_db
+from conditional import ContentVersions
 
-load_dotenv()
-
-mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017/')
-db_name = os.environ.get('DB_NAME', 'ai_tutor')
-
-client = AsyncIOMotorClient(mongo_url)
-db = client[db_name]
+# Seeding changes the listings, so clients' cached ETags must not match
+content_versions = ContentVersions(db.content_versions)
 
 async def seed_users():
     """Seed demo users"""
@@ -129,8 +123,8 @@ async def seed_books():
         )
     ]
     
-    for book in books:
-        await db.books.insert_one(book.dict())
+    await db.books.insert_many([book.dict() for book in books], ordered=False)
+    await content_versions.bump("books")
     
     print(f"✓ Seeded {len(books)} books")
 
@@ -216,8 +210,8 @@ async def seed_videos():
         )
     ]
     
-    for video in videos:
-        await db.videos.insert_one(video.dict())
+    await db.videos.insert_many([video.dict() for video in videos], ordered=False)
+    await content_versions.bump("videos")
     
     print(f"✓ Seeded {len(videos)} videos")
 
@@ -333,8 +327,8 @@ async def seed_quizzes():
         )
     ]
     
-    for quiz in quizzes:
-        await db.quizzes.insert_one(quiz.dict())
+    await db.quizzes.insert_many([quiz.dict() for quiz in quizzes], ordered=False)
+    await content_versions.bump("quizzes")
     
     print(f"✓ Seeded {len(quizzes)} quizzes")
 
@@ -360,7 +354,7 @@ async def main():
     except Exception as e:
         print(f"✗ Error seeding database: {str(e)}")
     finally:
-        client.close()
+        close_db()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,60 @@
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Tuple, Type
+import json
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+class TrustedDocuments:
+    """Serialises stored documents of a model without re-validating them, emitting only its declared fields"""
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self.fields: Tuple[str, ...] = tuple(model.model_fields)
+        # Static defaults fill fields a document lacks (older data, compact projections), as model(**doc) would
+        self.defaults: Dict[str, Any] = {
+            name: field.default
+            for name, field in model.model_fields.items()
+            if not field.is_required() and field.default_factory is None
+        }
+
+    def projection(self, exclude: Iterable[str] = ()) -> Dict[str, Any]:
+        """Inclusion projection reading only the model's fields"""
+        excluded = set(exclude)
+        return {"_id": 0, **{name: 1 for name in self.fields if name not in excluded}}
+
+    def rows(self, docs: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        fields, defaults = self.fields, self.defaults
+        return [
+            {name: doc[name] if name in doc else defaults[name] for name in fields if name in doc or name in defaults}
+            for doc in docs
+        ]
+
+    def response(self, docs: Iterable[Dict[str, Any]], response: Response) -> FastJSONResponse:
+        """Encode docs directly, keeping headers set on the route's Response (e.g. X-Next-Cursor)"""
+        return FastJSONResponse(self.rows(docs), headers=dict(response.headers))
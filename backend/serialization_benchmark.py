@@ -0,0 +1,122 @@
+"""
+Micro-benchmark of list response serialisation (models vs orjson vs trusted documents)
+Run: python serialization_benchmark.py [--sizes 100 1000] [--output serialization.json]
+"""
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from models import Book, BookCreate, Video, VideoCreate, Quiz, QuizCreate
+from serialization import FastJSONResponse, TrustedDocuments, orjson
+
+WORDS = ["light", "motion", "energy", "cells", "algebra", "acids", "guide", "practice", "revision", "theory"]
+
+def sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+def stored(model_doc) -> Dict[str, Any]:
+    """A model as MongoDB hands it back: enums as plain strings"""
+    return {key: value.value if isinstance(value, Enum) else value for key, value in model_doc.dict().items()}
+
+def taxonomy(rng: random.Random) -> Dict[str, Any]:
+    return {"stream": rng.choice(["CBSE", "ICSE"]), "class_level": rng.randint(6, 12), "subject": "Physics", "topic": sentence(rng, 2)}
+
+def make_book(rng: random.Random) -> Dict[str, Any]:
+    create = BookCreate(
+        title=sentence(rng, 5), author=sentence(rng, 2), content_url="https://example.com/book.pdf",
+        summary=sentence(rng, 60), tags=[rng.choice(WORDS) for _ in range(4)], **taxonomy(rng)
+    )
+    return stored(Book(**create.dict(), uploaded_by="teacher-1", approved=True))
+
+def make_video(rng: random.Random) -> Dict[str, Any]:
+    create = VideoCreate(
+        title=sentence(rng, 5), teacher_name=sentence(rng, 2), video_url="https://example.com/v.mp4",
+        duration=rng.randint(60, 3600), difficulty="beginner", tags=[rng.choice(WORDS) for _ in range(4)],
+        description=sentence(rng, 40), **taxonomy(rng)
+    )
+    return stored(Video(**create.dict(), uploaded_by="teacher-1", approved=True))
+
+def make_quiz(rng: random.Random) -> Dict[str, Any]:
+    questions = [
+        {"question": sentence(rng, 12) + "?", "options": [sentence(rng, 3) for _ in range(4)],
+         "correct_answer": rng.randint(0, 3), "explanation": sentence(rng, 20)}
+        for _ in range(10)
+    ]
+    create = QuizCreate(title=sentence(rng, 4), difficulty="intermediate", questions=questions, **taxonomy(rng))
+    return stored(Quiz(**create.dict(), created_by="teacher-1"))
+
+CONTENT = {"books": (Book, make_book), "videos": (Video, make_video), "quizzes": (Quiz, make_quiz)}
+
+def serialisers(model) -> Dict[str, Callable[[List[Dict[str, Any]]], bytes]]:
+    field = create_response_field(name="Response", type_=List[model])
+    trusted = TrustedDocuments(model)
+    loop = asyncio.new_event_loop()
+
+    def validated(docs: List[Dict[str, Any]]):
+        return loop.run_until_complete(serialize_response(field=field, response_content=[model(**doc) for doc in docs]))
+
+    return {
+        "models": lambda docs: JSONResponse(validated(docs)).body,
+        "orjson": lambda docs: FastJSONResponse(validated(docs)).body,
+        "trusted": lambda docs: FastJSONResponse(trusted.rows(docs)).body,
+    }
+
+def time_per_item(serialise: Callable, docs: List[Dict[str, Any]], min_seconds: float) -> float:
+    """Best microseconds per item over repeated runs lasting at least min_seconds"""
+    serialise(docs)
+    best = float("inf")
+    deadline = time.perf_counter() + min_seconds
+    runs = 0
+    while runs < 3 or time.perf_counter() < deadline:
+        started = time.perf_counter()
+        serialise(docs)
+        best = min(best, time.perf_counter() - started)
+        runs += 1
+    return best / len(docs) * 1_000_000
+
+def run(sizes: List[int], min_seconds: float, seed: int) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    results: Dict[str, Any] = {}
+    for content, (model, make) in CONTENT.items():
+        docs = [make(rng) for _ in range(max(sizes))]
+        paths = serialisers(model)
+        bodies = {name: json.loads(serialise(docs[:10])) for name, serialise in paths.items()}
+        if any(body != bodies["models"] for body in bodies.values()):
+            raise AssertionError(f"{content}: serialisation paths disagree")
+        for size in sizes:
+            results[f"{content}/{size}"] = {
+                name: round(time_per_item(serialise, docs[:size], min_seconds), 2)
+                for name, serialise in paths.items()
+            }
+    return results
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark list response serialisation")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[100, 1000])
+    parser.add_argument("--min-seconds", type=float, default=0.5, help="Minimum timing per case")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="Write JSON results to this path")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.min_seconds, args.seed)
+    print(f"encoder: {'orjson ' + orjson.__version__ if orjson else 'stdlib json'} (microseconds per item, best run)")
+    print(f"{'case':<16}{'models':>10}{'orjson':>10}{'trusted':>10}{'speedup':>10}")
+    for case, timings in results.items():
+        speedup = timings["models"] / timings["trusted"]
+        print(f"{case:<16}{timings['models']:>10}{timings['orjson']:>10}{timings['trusted']:>10}{speedup:>9.1f}x")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"unit": "us_per_item", "results": results}, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
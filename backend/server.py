@@ -1,27 +1,57 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, UploadFile, File
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, UploadFile, File, Query, Response, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse
 from dotenv import load_dotenv
 from pathlib import Path
+from contextlib import aclosing
 import os
 import logging
-from typing import Optional, List
+from typing import Awaitable, Callable, Optional, List, Tuple, Union
 from datetime import datetime
 import asyncio
+import hashlib
+import json
 
 from models import *
-from auth import verify_password, get_password_hash, create_access_token, decode_access_token
+from cache import TTLCache
+from auth import (
+    verify_password_async, get_password_hash_async, create_access_token, decode_access_token,
+    shutdown_hash_pool
+)
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from database import (
     db, users_collection, books_collection, videos_collection,
     quizzes_collection, quiz_attempts_collection, chat_sessions_collection,
-    topic_progress_collection, student_profiles_collection, init_db
+    topic_progress_collection, student_profiles_collection, content_versions_collection,
+    init_db, connect_db, close_db, pool_metrics
+)
+from tutor_llm import build_system_message, llm_pool
+from answer_cache import answer_cache
+from search_index import books_index, videos_index, FILTER_FIELDS, SEARCH_CANDIDATE_LIMIT, SEARCH_INDEX_REFRESH_SECONDS
+from pagination import (
+    MAX_PAGE_SIZE, CREATED_ORDER, UPDATED_ORDER, TOPIC_ORDER, InvalidCursor,
+    paginate, page_offset, offset_cursor
 )
-from emergentintegrations.llm.chat import LlmChat, UserMessage
+from grading import grade_answers, grade_many
+from answer_keys import answer_keys
+from bulk_import import bulk_import
+from taxonomy import taxonomy, TAXONOMY_REFRESH_SECONDS
+from events import events, CONTENT_PUBLISHED, CONTENT_REJECTED
+from metrics import registry, Gauge, MetricsMiddleware
+import profiling
+from serialization import FastJSONResponse, TrustedDocuments, dumps
+from compression import CompressionMiddleware
+from conditional import ContentVersions, etag_matches, listing_scope
+from catalogue_cache import catalogue_cache
+from user_stats import create_user_stats, record_progress_changes, get_user_stats, format_dashboard
+from chat_context import CONTEXT_FETCH_MESSAGES, build_context, render_system_message
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # Create the main app
-app = FastAPI(title="AI Tutor Platform")
+app = FastAPI(title="AI Tutor Platform", default_response_class=FastJSONResponse)
 
 # Create router with /api prefix
 api_router = APIRouter(prefix="/api")
@@ -34,6 +64,16 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # ============= Authentication Dependency =============
+# Verified principals keyed by token subject, so authenticated routes skip the per-request user lookup
+principal_cache = TTLCache(
+    maxsize=int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "300"))
+)
+
+def invalidate_principal(user_id: str):
+    """Drop a cached principal after its user record changes"""
+    principal_cache.invalidate(user_id)
+
 async def get_current_user(authorization: Optional[str] = Header(None)) -> UserInDB:
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Not authenticated")
@@ -48,11 +88,17 @@ async def get_current_user(authorization: Optional[str] = Header(None)) -> UserI
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token")
     
+    cached_user = principal_cache.get(user_id)
+    if cached_user is not None:
+        return cached_user
+    
     user_doc = await users_collection.find_one({"id": user_id})
     if not user_doc:
         raise HTTPException(status_code=401, detail="User not found")
     
-    return UserInDB(**user_doc)
+    user = UserInDB(**user_doc)
+    principal_cache.set(user_id, user)
+    return user
 
 # ============= Authentication Routes =============
 @api_router.post("/auth/register")
@@ -72,10 +118,12 @@ async def register(user_data: UserCreate):
     
     user_in_db = UserInDB(
         **user.dict(),
-        password_hash=get_password_hash(user_data.password)
+        password_hash=await get_password_hash_async(user_data.password)
     )
     
     await users_collection.insert_one(user_in_db.dict())
+    await create_user_stats(user.id)
+    invalidate_principal(user.id)
     
     # Create access token
     access_token = create_access_token(data={"sub": user.id, "role": user.role})
@@ -94,9 +142,15 @@ async def login(credentials: UserLogin):
     
     user_in_db = UserInDB(**user_doc)
     
-    if not verify_password(credentials.password, user_in_db.password_hash):
+    valid, new_hash = await verify_password_async(credentials.password, user_in_db.password_hash)
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
+    # Rehash with the current cost factor
+    if new_hash:
+        await users_collection.update_one({"id": user_in_db.id}, {"$set": {"password_hash": new_hash}})
+        invalidate_principal(user_in_db.id)
+    
     access_token = create_access_token(data={"sub": user_in_db.id, "role": user_in_db.role})
     
     user = User(**{k: v for k, v in user_in_db.dict().items() if k != 'password_hash'})
@@ -112,6 +166,149 @@ async def get_me(current_user: UserInDB = Depends(get_current_user)):
     user = User(**{k: v for k, v in current_user.dict().items() if k != 'password_hash'})
     return user
 
+# ============= Search =============
+def rank_by_ids(docs: list, ranked_ids: List[str]) -> list:
+    """Order documents by their position in a search ranking"""
+    position = {doc_id: i for i, doc_id in enumerate(ranked_ids)}
+    return sorted(docs, key=lambda doc: position.get(doc["id"], len(position)))
+
+async def search_page(collection, index, search: str, query: dict, cursor: Optional[str], limit: int, projection: Optional[dict]):
+    """Page through search results in relevance order; returns (docs, next_cursor)"""
+    # Taxonomy filters narrow the matches in the index; approval can change on any worker, so the
+    # database checks it (and the filters again), a candidate chunk at a time until the page is full
+    filters = {field: value for field, value in query.items() if field in FILTER_FIELDS}
+    ranked_ids = [doc_id for doc_id, _ in index.search(search, filters)]
+    offset = page_offset(cursor)
+    result_ids = []
+    for start in range(0, len(ranked_ids), SEARCH_CANDIDATE_LIMIT):
+        candidates = ranked_ids[start:start + SEARCH_CANDIDATE_LIMIT]
+        matched = await collection.find(
+            {**query, "id": {"$in": candidates}}, {"_id": 0, "id": 1}
+        ).to_list(len(candidates))
+        matched_ids = {doc["id"] for doc in matched}
+        result_ids.extend(doc_id for doc_id in candidates if doc_id in matched_ids)
+        if len(result_ids) > offset + limit:
+            break
+    
+    page_ids = result_ids[offset:offset + limit]
+    if not page_ids:
+        return [], None
+    docs = await collection.find({"id": {"$in": page_ids}}, projection).to_list(len(page_ids))
+    return rank_by_ids(docs, page_ids), offset_cursor(offset + limit, len(result_ids))
+
+async def refresh_search_indexes():
+    """Periodically index content inserted through other workers"""
+    while True:
+        await asyncio.sleep(SEARCH_INDEX_REFRESH_SECONDS)
+        try:
+            await books_index.refresh(books_collection)
+            await videos_index.refresh(videos_collection)
+        except Exception as e:
+            logger.error(f"Search index refresh error: {str(e)}")
+
+SEARCH_INDEXES = {"books": books_index, "videos": videos_index}
+
+def drop_rejected_from_search(payload: dict):
+    """Rejected content can never be listed, so stop matching it"""
+    index = SEARCH_INDEXES.get(payload["collection"])
+    if index:
+        for doc in payload["docs"]:
+            index.remove(doc["id"])
+
+events.subscribe(CONTENT_REJECTED, drop_rejected_from_search)
+
+# ============= Pagination =============
+async def load_page(
+    collection,
+    query: dict,
+    sort: list,
+    limit: int,
+    cursor: Optional[str] = None,
+    projection: Optional[dict] = None,
+    search: Optional[str] = None,
+    index=None
+) -> Tuple[list, Optional[str]]:
+    """Fetch one page of a listing; returns (docs, next_cursor)"""
+    try:
+        if search:
+            return await search_page(collection, index, search, query, cursor, limit, projection)
+        return await paginate(collection, query, sort, limit, cursor, projection)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def fetch_page(response: Response, *args, **kwargs) -> list:
+    """Fetch one page of a listing and expose the next cursor in the X-Next-Cursor header"""
+    docs, next_cursor = await load_page(*args, **kwargs)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return docs
+
+# Listings encode stored documents directly; response_model still documents the schema
+trusted_books = TrustedDocuments(Book)
+trusted_videos = TrustedDocuments(Video)
+trusted_quizzes = TrustedDocuments(Quiz)
+trusted_quiz_summaries = TrustedDocuments(QuizSummary)
+
+# Listings read only the fields their model declares; compact=true also drops heavy fields
+BOOK_PROJECTION = trusted_books.projection()
+BOOK_COMPACT_PROJECTION = trusted_books.projection(exclude=["summary"])
+VIDEO_PROJECTION = trusted_videos.projection()
+VIDEO_COMPACT_PROJECTION = trusted_videos.projection(exclude=["description"])
+QUIZ_PROJECTION = trusted_quizzes.projection()
+QUIZ_COMPACT_PROJECTION = {**trusted_quiz_summaries.projection(), "question_count": {"$size": "$questions"}}
+
+content_versions = ContentVersions(content_versions_collection)
+
+async def bump_listing_version(payload: dict):
+    """Published content changes the listings that can show it, invalidating their ETags and cache entries"""
+    name = payload["collection"]
+    try:
+        await content_versions.bump(name, payload["docs"])
+        return
+    except Exception:
+        logger.exception(f"Could not bump {name} listing versions; invalidating every {name} listing instead")
+    try:
+        await content_versions.bump(name)
+    except Exception:
+        logger.exception(f"Could not invalidate {name} listings; cached listings and ETags may be stale")
+        catalogue_cache.clear_local()
+
+events.subscribe(CONTENT_PUBLISHED, bump_listing_version)
+
+async def serve_listing(
+    name: str,
+    request: Request,
+    if_none_match: Optional[str],
+    scope: str,
+    trusted: TrustedDocuments,
+    load: Callable[[], Awaitable[Tuple[list, Optional[str]]]],
+    variant: str = ""
+) -> Response:
+    """Catalogue listing with a scope-versioned ETag: 304 if the client is current, else read through the cache"""
+    etag = await content_versions.etag(name, scope, request.query_params.multi_items(), variant)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    
+    async def load_body():
+        docs, next_cursor = await load()
+        return dumps(trusted.rows(docs)), next_cursor
+    
+    body, next_cursor = await catalogue_cache.get_or_load(etag.strip('"'), load_body)
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# ============= Bulk Import =============
+async def run_bulk_import(request: Request, build_doc, collection, on_inserted) -> Response:
+    """Stream-import a JSON array or NDJSON request body into a collection"""
+    report = await bulk_import(
+        request.stream(), request.headers.get("content-type"), build_doc, collection, on_inserted
+    )
+    if report["payload_error"]:
+        return JSONResponse(status_code=400, content=report)
+    return JSONResponse(content=report)
+
 # ============= Book Routes =============
 @api_router.post("/books", response_model=Book)
 async def create_book(book: BookCreate, current_user: UserInDB = Depends(get_current_user)):
@@ -124,15 +321,41 @@ async def create_book(book: BookCreate, current_user: UserInDB = Depends(get_cur
         book_doc.approved = True
     
     await books_collection.insert_one(book_doc.dict())
+    books_index.add(book_doc.dict())
+    if book_doc.approved:
+        await events.publish(CONTENT_PUBLISHED, {"collection": "books", "docs": [book_doc.dict()]})
     return book_doc
 
+@api_router.post("/books/bulk")
+async def bulk_create_books(request: Request, current_user: UserInDB = Depends(get_current_user)):
+    """Import many books from a JSON array or NDJSON body"""
+    if current_user.role not in [UserRole.ADMIN, UserRole.TEACHER]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    approved = current_user.role == UserRole.ADMIN
+    
+    def build_doc(record: dict) -> dict:
+        return Book(**BookCreate(**record).dict(), uploaded_by=current_user.id, approved=approved).dict()
+    
+    async def on_inserted(docs: list):
+        books_index.add_many(docs)
+        if approved:
+            await events.publish(CONTENT_PUBLISHED, {"collection": "books", "docs": docs})
+    
+    return await run_bulk_import(request, build_doc, books_collection, on_inserted)
+
 @api_router.get("/books", response_model=List[Book])
 async def get_books(
+    request: Request,
     stream: Optional[str] = None,
     class_level: Optional[int] = None,
     subject: Optional[str] = None,
     topic: Optional[str] = None,
-    search: Optional[str] = None
+    search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    compact: bool = False,
+    if_none_match: Optional[str] = Header(None)
 ):
     query = {"approved": True}
     
@@ -144,15 +367,18 @@ async def get_books(
         query["subject"] = subject
     if topic:
         query["topic"] = topic
-    if search:
-        query["$or"] = [
-            {"title": {"$regex": search, "$options": "i"}},
-            {"author": {"$regex": search, "$options": "i"}},
-            {"tags": {"$regex": search, "$options": "i"}}
-        ]
     
-    books = await books_collection.find(query).to_list(100)
-    return [Book(**book) for book in books]
+    async def load():
+        return await load_page(
+            books_collection, query, CREATED_ORDER, limit, cursor,
+            projection=BOOK_COMPACT_PROJECTION if compact else BOOK_PROJECTION,
+            search=search, index=books_index
+        )
+    
+    scope = listing_scope(stream, class_level, subject)
+    # Search results come from this worker's index, which can lag other workers' writes
+    variant = books_index.generation if search else ""
+    return await serve_listing("books", request, if_none_match, scope, trusted_books, load, variant)
 
 @api_router.get("/books/{book_id}", response_model=Book)
 async def get_book(book_id: str):
@@ -173,16 +399,42 @@ async def create_video(video: VideoCreate, current_user: UserInDB = Depends(get_
         video_doc.approved = True
     
     await videos_collection.insert_one(video_doc.dict())
+    videos_index.add(video_doc.dict())
+    if video_doc.approved:
+        await events.publish(CONTENT_PUBLISHED, {"collection": "videos", "docs": [video_doc.dict()]})
     return video_doc
 
+@api_router.post("/videos/bulk")
+async def bulk_create_videos(request: Request, current_user: UserInDB = Depends(get_current_user)):
+    """Import many videos from a JSON array or NDJSON body"""
+    if current_user.role not in [UserRole.ADMIN, UserRole.TEACHER]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    approved = current_user.role == UserRole.ADMIN
+    
+    def build_doc(record: dict) -> dict:
+        return Video(**VideoCreate(**record).dict(), uploaded_by=current_user.id, approved=approved).dict()
+    
+    async def on_inserted(docs: list):
+        videos_index.add_many(docs)
+        if approved:
+            await events.publish(CONTENT_PUBLISHED, {"collection": "videos", "docs": docs})
+    
+    return await run_bulk_import(request, build_doc, videos_collection, on_inserted)
+
 @api_router.get("/videos", response_model=List[Video])
 async def get_videos(
+    request: Request,
     stream: Optional[str] = None,
     class_level: Optional[int] = None,
     subject: Optional[str] = None,
     topic: Optional[str] = None,
     difficulty: Optional[str] = None,
-    search: Optional[str] = None
+    search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    compact: bool = False,
+    if_none_match: Optional[str] = Header(None)
 ):
     query = {"approved": True}
     
@@ -196,15 +448,18 @@ async def get_videos(
         query["topic"] = topic
     if difficulty:
         query["difficulty"] = difficulty
-    if search:
-        query["$or"] = [
-            {"title": {"$regex": search, "$options": "i"}},
-            {"teacher_name": {"$regex": search, "$options": "i"}},
-            {"tags": {"$regex": search, "$options": "i"}}
-        ]
     
-    videos = await videos_collection.find(query).to_list(100)
-    return [Video(**video) for video in videos]
+    async def load():
+        return await load_page(
+            videos_collection, query, CREATED_ORDER, limit, cursor,
+            projection=VIDEO_COMPACT_PROJECTION if compact else VIDEO_PROJECTION,
+            search=search, index=videos_index
+        )
+    
+    scope = listing_scope(stream, class_level, subject)
+    # Search results come from this worker's index, which can lag other workers' writes
+    variant = videos_index.generation if search else ""
+    return await serve_listing("videos", request, if_none_match, scope, trusted_videos, load, variant)
 
 @api_router.get("/videos/{video_id}", response_model=Video)
 async def get_video(video_id: str):
@@ -221,14 +476,37 @@ async def create_quiz(quiz: QuizCreate, current_user: UserInDB = Depends(get_cur
     
     quiz_doc = Quiz(**quiz.dict(), created_by=current_user.id)
     await quizzes_collection.insert_one(quiz_doc.dict())
+    answer_keys.invalidate(quiz_doc.id)
+    await events.publish(CONTENT_PUBLISHED, {"collection": "quizzes", "docs": [quiz_doc.dict()]})
     return quiz_doc
 
-@api_router.get("/quizzes", response_model=List[Quiz])
+@api_router.post("/quizzes/bulk")
+async def bulk_create_quizzes(request: Request, current_user: UserInDB = Depends(get_current_user)):
+    """Import many quizzes from a JSON array or NDJSON body"""
+    if current_user.role not in [UserRole.ADMIN, UserRole.TEACHER]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    def build_doc(record: dict) -> dict:
+        return Quiz(**QuizCreate(**record).dict(), created_by=current_user.id).dict()
+    
+    async def on_inserted(docs: list):
+        for doc in docs:
+            answer_keys.invalidate(doc["id"])
+        await events.publish(CONTENT_PUBLISHED, {"collection": "quizzes", "docs": docs})
+    
+    return await run_bulk_import(request, build_doc, quizzes_collection, on_inserted)
+
+@api_router.get("/quizzes", response_model=List[Union[Quiz, QuizSummary]])
 async def get_quizzes(
+    request: Request,
     stream: Optional[str] = None,
     class_level: Optional[int] = None,
     subject: Optional[str] = None,
-    topic: Optional[str] = None
+    topic: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    compact: bool = False,
+    if_none_match: Optional[str] = Header(None)
 ):
     query = {}
     
@@ -241,28 +519,28 @@ async def get_quizzes(
     if topic:
         query["topic"] = topic
     
-    quizzes = await quizzes_collection.find(query).to_list(100)
-    return [Quiz(**quiz) for quiz in quizzes]
+    async def load():
+        return await load_page(
+            quizzes_collection, query, CREATED_ORDER, limit, cursor,
+            projection=QUIZ_COMPACT_PROJECTION if compact else QUIZ_PROJECTION
+        )
+    
+    scope = listing_scope(stream, class_level, subject)
+    trusted = trusted_quiz_summaries if compact else trusted_quizzes
+    return await serve_listing("quizzes", request, if_none_match, scope, trusted, load)
 
 @api_router.post("/quizzes/{quiz_id}/attempt")
 async def submit_quiz(
     quiz_id: str,
-    answers: List[int],
+    answers: List[AnswerIndex],
     current_user: UserInDB = Depends(get_current_user)
 ):
-    quiz_doc = await quizzes_collection.find_one({"id": quiz_id})
-    if not quiz_doc:
+    answer_key = await answer_keys.get(quiz_id)
+    if answer_key is None:
         raise HTTPException(status_code=404, detail="Quiz not found")
     
-    quiz = Quiz(**quiz_doc)
-    
     # Calculate score
-    correct_count = 0
-    for i, answer in enumerate(answers):
-        if i < len(quiz.questions) and answer == quiz.questions[i].correct_answer:
-            correct_count += 1
-    
-    score = (correct_count / len(quiz.questions)) * 100 if quiz.questions else 0
+    correct_count, score = grade_answers(answer_key.answers, answers)
     
     attempt = QuizAttempt(
         quiz_id=quiz_id,
@@ -276,75 +554,186 @@ async def submit_quiz(
     # Update progress
     await update_topic_progress(
         current_user.id,
-        quiz.stream,
-        quiz.class_level,
-        quiz.subject,
-        quiz.topic,
+        answer_key.stream,
+        answer_key.class_level,
+        answer_key.subject,
+        answer_key.topic,
         score
     )
     
     return {
         "score": score,
         "correct": correct_count,
-        "total": len(quiz.questions),
+        "total": answer_key.question_count,
         "attempt_id": attempt.id
     }
 
+QUIZ_BATCH_MAX_ATTEMPTS = int(os.getenv("QUIZ_BATCH_MAX_ATTEMPTS", "500"))
+
+@api_router.post("/quizzes/attempts/batch")
+async def submit_quiz_batch(
+    batch: QuizAttemptBatch,
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """Grade and record many attempts (e.g. synced from offline tablets) in one request"""
+    if len(batch.attempts) > QUIZ_BATCH_MAX_ATTEMPTS:
+        raise HTTPException(status_code=413, detail=f"At most {QUIZ_BATCH_MAX_ATTEMPTS} attempts per batch")
+    
+    keys = await answer_keys.get_many(submission.quiz_id for submission in batch.attempts)
+    
+    # Group submissions per quiz and grade each group in one vectorised pass
+    by_quiz = {}
+    for index, submission in enumerate(batch.attempts):
+        by_quiz.setdefault(submission.quiz_id, []).append(index)
+    
+    results = [None] * len(batch.attempts)
+    attempt_docs = []
+    topic_totals = {}
+    for quiz_id, indexes in by_quiz.items():
+        answer_key = keys.get(quiz_id)
+        if answer_key is None:
+            for index in indexes:
+                results[index] = {"index": index, "quiz_id": quiz_id, "error": "Quiz not found"}
+            continue
+        
+        correct, scores = grade_many(answer_key.answers, [batch.attempts[i].answers for i in indexes])
+        for index, correct_count, score in zip(indexes, correct.tolist(), scores.tolist()):
+            submission = batch.attempts[index]
+            attempt = QuizAttempt(
+                quiz_id=quiz_id,
+                user_id=current_user.id,
+                answers=submission.answers,
+                score=score,
+                completed_at=submission.completed_at or datetime.utcnow()
+            )
+            attempt_docs.append(attempt.dict())
+            results[index] = {
+                "index": index,
+                "quiz_id": quiz_id,
+                "score": score,
+                "correct": correct_count,
+                "total": answer_key.question_count,
+                "attempt_id": attempt.id
+            }
+            totals = topic_totals.setdefault(
+                (answer_key.subject, answer_key.topic),
+                {"stream": answer_key.stream, "class_level": answer_key.class_level, "attempts": 0, "score_total": 0.0}
+            )
+            totals["attempts"] += 1
+            totals["score_total"] += score
+    
+    if attempt_docs:
+        await quiz_attempts_collection.insert_many(attempt_docs, ordered=False)
+        await apply_topic_progress_batch(current_user.id, topic_totals)
+    
+    graded = len(attempt_docs)
+    return {"graded": graded, "failed": len(results) - graded, "results": results}
+
 # ============= AI Chat Routes =============
+# Sessions stored before message_count was kept are counted from their messages
+MESSAGE_COUNT_EXPR = {"$ifNull": ["$message_count", {"$size": {"$ifNull": ["$messages", []]}}]}
+CHAT_SESSION_HEADER_PROJECTION = {
+    "_id": 0, **{name: 1 for name in ChatSessionHeader.model_fields}, "message_count": MESSAGE_COUNT_EXPR
+}
+
+async def load_chat_session(chat_request: ChatRequest, current_user: UserInDB) -> ChatSession:
+    """Get the requested chat session header (without messages) or start a new one"""
+    if chat_request.session_id:
+        session_doc = await chat_sessions_collection.find_one(
+            {"id": chat_request.session_id, "user_id": current_user.id},
+            {"messages": 0}
+        )
+        if session_doc:
+            if "message_count" not in session_doc:
+                # Backfilled before this turn's $inc so the count covers the earlier messages
+                await chat_sessions_collection.update_one(
+                    {"id": session_doc["id"], "message_count": {"$exists": False}},
+                    [{"$set": {"message_count": MESSAGE_COUNT_EXPR}}]
+                )
+            return ChatSession(**session_doc)
+    return ChatSession(user_id=current_user.id, subject=chat_request.subject, topic=chat_request.topic)
+
+async def save_chat_messages(session: ChatSession, *messages: ChatMessage):
+    """Atomically append messages to the session, creating it if needed"""
+    session.updated_at = datetime.utcnow()
+    
+    await chat_sessions_collection.update_one(
+        {"id": session.id, "user_id": session.user_id},
+        {
+            "$push": {"messages": {"$each": [message.dict() for message in messages]}},
+            "$inc": {"message_count": len(messages)},
+            "$set": {"updated_at": session.updated_at},
+            "$setOnInsert": {
+                "subject": session.subject,
+                "topic": session.topic,
+                "created_at": session.created_at
+            }
+        },
+        upsert=True
+    )
+
+async def save_chat_turn(session: ChatSession, user_message: ChatMessage, ai_text: str):
+    """Atomically append a user/assistant exchange to the session"""
+    await save_chat_messages(session, user_message, ChatMessage(role="assistant", content=ai_text))
+
+async def load_chat_context(session: ChatSession, system_message: str) -> str:
+    """Build the model prompt from the rolling summary and the recent turns that fit the token budget"""
+    session_doc = await chat_sessions_collection.find_one(
+        {"id": session.id, "user_id": session.user_id},
+        {"_id": 0, "messages": {"$slice": -CONTEXT_FETCH_MESSAGES}}
+    )
+    if not session_doc:
+        return system_message
+    
+    window, summary, summarized_count = build_context(session_doc)
+    if summarized_count != session_doc.get("summarized_count", 0):
+        await chat_sessions_collection.update_one(
+            {"id": session.id},
+            {"$set": {"summary": summary, "summarized_count": summarized_count}}
+        )
+    return render_system_message(system_message, summary, window)
+
+# Keeps fire-and-forget tasks referenced until they finish
+background_tasks = set()
+
+def run_in_background(coro):
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+async def get_cached_answer(chat_request: ChatRequest) -> Optional[str]:
+    if not answer_cache.is_cacheable(chat_request.context_type):
+        return None
+    return answer_cache.lookup(
+        chat_request.message, chat_request.subject, chat_request.topic, chat_request.context_type
+    )
+
+def cache_answer(chat_request: ChatRequest, answer: str):
+    if answer and answer_cache.is_cacheable(chat_request.context_type):
+        answer_cache.store(
+            chat_request.message, chat_request.subject, chat_request.topic, chat_request.context_type, answer
+        )
+
 @api_router.post("/chat")
 async def chat_with_ai(
     chat_request: ChatRequest,
     current_user: UserInDB = Depends(get_current_user)
 ):
     try:
-        # Get or create session
-        if chat_request.session_id:
-            session_doc = await chat_sessions_collection.find_one({"id": chat_request.session_id})
-            if session_doc:
-                session = ChatSession(**session_doc)
-            else:
-                session = ChatSession(user_id=current_user.id, subject=chat_request.subject, topic=chat_request.topic)
-        else:
-            session = ChatSession(user_id=current_user.id, subject=chat_request.subject, topic=chat_request.topic)
-        
-        # Add user message to session
+        session = await load_chat_session(chat_request, current_user)
         user_message = ChatMessage(role="user", content=chat_request.message)
-        session.messages.append(user_message)
-        
-        # Create AI chat instance
-        emergent_llm_key = os.getenv("EMERGENT_LLM_KEY")
         
-        # Build system message based on context
-        if chat_request.context_type == "summary":
-            system_message = f"You are an expert AI tutor for {chat_request.subject or 'various subjects'}. Provide clear, concise summaries of educational topics. Focus on key concepts and make them easy to understand for students."
-        elif chat_request.context_type == "doubt":
-            system_message = f"You are an AI tutor helping students with doubts and questions about {chat_request.subject or 'their subjects'}. Provide detailed explanations with examples. Be patient, encouraging, and thorough."
-        else:
-            system_message = "You are a helpful AI tutor. Assist students with their learning needs."
-        
-        # Create LLM chat
-        llm_chat = LlmChat(
-            api_key=emergent_llm_key,
-            session_id=session.id,
-            system_message=system_message
-        ).with_model("openai", "gpt-5.2")
-        
-        # Get AI response
-        ai_response_text = await llm_chat.send_message(
-            UserMessage(text=chat_request.message)
-        )
-        
-        # Add AI response to session
-        ai_message = ChatMessage(role="assistant", content=ai_response_text)
-        session.messages.append(ai_message)
-        session.updated_at = datetime.utcnow()
+        ai_response_text = await get_cached_answer(chat_request)
+        if ai_response_text is None:
+            # Get AI response from a pooled client
+            system_message = build_system_message(chat_request.context_type, chat_request.subject)
+            prompt = await load_chat_context(session, system_message)
+            ai_response_text = await llm_pool.send(system_message, prompt, chat_request.message)
+            cache_answer(chat_request, ai_response_text)
         
         # Save session
-        await chat_sessions_collection.update_one(
-            {"id": session.id},
-            {"$set": session.dict()},
-            upsert=True
-        )
+        await save_chat_turn(session, user_message, ai_response_text)
         
         return {
             "response": ai_response_text,
@@ -355,13 +744,73 @@ async def chat_with_ai(
         logger.error(f"Chat error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
 
-@api_router.get("/chat/sessions")
-async def get_chat_sessions(current_user: UserInDB = Depends(get_current_user)):
-    sessions = await chat_sessions_collection.find(
-        {"user_id": current_user.id}
-    ).sort("updated_at", -1).to_list(50)
+def sse_event(data: dict, event: Optional[str] = None) -> str:
+    payload = f"data: {json.dumps(data)}\n\n"
+    return f"event: {event}\n{payload}" if event else payload
+
+@api_router.post("/chat/stream")
+async def chat_with_ai_stream(
+    chat_request: ChatRequest,
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """Stream the tutor reply as server-sent events"""
+    try:
+        session = await load_chat_session(chat_request, current_user)
+        cached_answer = await get_cached_answer(chat_request)
+        system_message = build_system_message(chat_request.context_type, chat_request.subject)
+        prompt = None if cached_answer is not None else await load_chat_context(session, system_message)
+        # Stored before generation starts, so the question is kept however the stream ends
+        await save_chat_messages(session, ChatMessage(role="user", content=chat_request.message))
+    except Exception as e:
+        logger.error(f"Chat stream error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
+    
+    async def event_stream():
+        chunks = []
+        saved = False
+        try:
+            yield sse_event({"session_id": session.id}, event="session")
+            if cached_answer is not None:
+                chunks.append(cached_answer)
+                yield sse_event({"token": cached_answer})
+            else:
+                tokens = llm_pool.stream(system_message, prompt, chat_request.message)
+                async with aclosing(tokens):
+                    async for chunk in tokens:
+                        chunks.append(chunk)
+                        yield sse_event({"token": chunk})
+                cache_answer(chat_request, "".join(chunks))
+            
+            await save_chat_messages(session, ChatMessage(role="assistant", content="".join(chunks)))
+            saved = True
+            yield sse_event({"session_id": session.id}, event="done")
+        except Exception as e:
+            logger.error(f"Chat stream error: {str(e)}")
+            yield sse_event({"detail": f"Error processing chat: {str(e)}"}, event="error")
+        finally:
+            # Client disconnected or the model failed mid-reply: keep what was generated
+            if not saved and chunks:
+                run_in_background(save_chat_messages(session, ChatMessage(role="assistant", content="".join(chunks))))
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api_router.get("/chat/sessions", response_model=List[ChatSessionHeader])
+async def get_chat_sessions(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    current_user: UserInDB = Depends(get_current_user)
+):
+    sessions = await fetch_page(
+        response, chat_sessions_collection, {"user_id": current_user.id}, UPDATED_ORDER, limit, cursor,
+        projection=CHAT_SESSION_HEADER_PROJECTION
+    )
     
-    return [ChatSession(**session) for session in sessions]
+    return [ChatSessionHeader(**session) for session in sessions]
 
 @api_router.get("/chat/sessions/{session_id}")
 async def get_chat_session(
@@ -379,6 +828,51 @@ async def get_chat_session(
     return ChatSession(**session_doc)
 
 # ============= Progress Tracking =============
+def topic_progress_pipeline(
+    stream: Stream,
+    class_level: int,
+    attempts: int = 0,
+    score_total: float = 0.0
+) -> list:
+    """Update pipeline adding quiz attempts to a topic and recomputing the running mean server-side"""
+    return [
+        {"$set": {
+            "stream": {"$ifNull": ["$stream", stream]},
+            "class_level": {"$ifNull": ["$class_level", class_level]},
+            "time_spent": {"$ifNull": ["$time_spent", 0]},
+            "last_accessed": datetime.utcnow(),
+            # Documents written before score_total existed rebuild it from the stored mean
+            "score_total": {"$add": [
+                {"$ifNull": ["$score_total", {"$multiply": [
+                    {"$ifNull": ["$average_score", 0]}, {"$ifNull": ["$quiz_attempts", 0]}
+                ]}]},
+                score_total
+            ]},
+            "quiz_attempts": {"$add": [{"$ifNull": ["$quiz_attempts", 0]}, attempts]}
+        }},
+        {"$set": {
+            "average_score": {"$cond": [
+                {"$gt": ["$quiz_attempts", 0]}, {"$divide": ["$score_total", "$quiz_attempts"]}, 0
+            ]}
+        }},
+        {"$set": {"mastery_level": {"$min": ["$average_score", 100]}}}
+    ]
+
+TOPIC_PROGRESS_BEFORE_PROJECTION = {"_id": 0, "quiz_attempts": 1, "score_total": 1, "average_score": 1, "mastery_level": 1}
+
+async def upsert_topic_progress(query: dict, pipeline: list) -> Optional[dict]:
+    """Apply a topic progress pipeline atomically, returning the document as it was before (None if new)"""
+    try:
+        return await topic_progress_collection.find_one_and_update(
+            query, pipeline, projection=TOPIC_PROGRESS_BEFORE_PROJECTION, upsert=True,
+            return_document=ReturnDocument.BEFORE
+        )
+    except DuplicateKeyError:
+        # Lost an upsert race on the unique topic index; the document exists now
+        return await topic_progress_collection.find_one_and_update(
+            query, pipeline, projection=TOPIC_PROGRESS_BEFORE_PROJECTION, return_document=ReturnDocument.BEFORE
+        )
+
 async def update_topic_progress(
     user_id: str,
     stream: Stream,
@@ -387,133 +881,306 @@ async def update_topic_progress(
     topic: str,
     quiz_score: Optional[float] = None
 ):
-    """Update student's progress for a topic"""
-    progress_doc = await topic_progress_collection.find_one({
-        "user_id": user_id,
-        "subject": subject,
-        "topic": topic
-    })
-    
-    if progress_doc:
-        progress = TopicProgress(**progress_doc)
-        progress.last_accessed = datetime.utcnow()
-        
-        if quiz_score is not None:
-            progress.quiz_attempts += 1
-            # Update average score
-            total_score = progress.average_score * (progress.quiz_attempts - 1) + quiz_score
-            progress.average_score = total_score / progress.quiz_attempts
-            # Update mastery level based on average score
-            progress.mastery_level = min(progress.average_score, 100)
-        
-        await topic_progress_collection.update_one(
+    """Update student's progress for a topic in a single atomic upsert, then roll it into the user's stats"""
+    attempts = 0 if quiz_score is None else 1
+    score_total = quiz_score or 0.0
+    before = await upsert_topic_progress(
+        {"user_id": user_id, "subject": subject, "topic": topic},
+        topic_progress_pipeline(stream, class_level, attempts, score_total)
+    )
+    await record_progress_changes(user_id, [(subject, before, attempts, score_total)])
+
+async def apply_topic_progress_batch(user_id: str, topic_totals: dict):
+    """Apply {(subject, topic): {stream, class_level, attempts, score_total}} atomically per topic, then to the user's stats"""
+    changes = list(topic_totals.items())
+    befores = await asyncio.gather(*(
+        upsert_topic_progress(
             {"user_id": user_id, "subject": subject, "topic": topic},
-            {"$set": progress.dict()}
-        )
-    else:
-        progress = TopicProgress(
-            user_id=user_id,
-            stream=stream,
-            class_level=class_level,
-            subject=subject,
-            topic=topic,
-            mastery_level=quiz_score if quiz_score else 0,
-            quiz_attempts=1 if quiz_score else 0,
-            average_score=quiz_score if quiz_score else 0
+            topic_progress_pipeline(totals["stream"], totals["class_level"], totals["attempts"], totals["score_total"])
         )
-        await topic_progress_collection.insert_one(progress.dict())
+        for (subject, topic), totals in changes
+    ))
+    await record_progress_changes(user_id, [
+        (subject, before, totals["attempts"], totals["score_total"])
+        for ((subject, topic), totals), before in zip(changes, befores)
+    ])
 
 @api_router.get("/progress")
-async def get_progress(current_user: UserInDB = Depends(get_current_user)):
-    progress_docs = await topic_progress_collection.find(
-        {"user_id": current_user.id}
-    ).to_list(100)
+async def get_progress(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    current_user: UserInDB = Depends(get_current_user)
+):
+    progress_docs = await fetch_page(
+        response, topic_progress_collection, {"user_id": current_user.id}, TOPIC_ORDER, limit, cursor
+    )
     
     return [TopicProgress(**doc) for doc in progress_docs]
 
 @api_router.get("/progress/{subject}")
 async def get_subject_progress(
     subject: str,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     current_user: UserInDB = Depends(get_current_user)
 ):
-    progress_docs = await topic_progress_collection.find({
-        "user_id": current_user.id,
-        "subject": subject
-    }).to_list(100)
+    progress_docs = await fetch_page(
+        response, topic_progress_collection, {"user_id": current_user.id, "subject": subject},
+        TOPIC_ORDER, limit, cursor
+    )
     
     return [TopicProgress(**doc) for doc in progress_docs]
 
 # ============= Dashboard Statistics =============
 @api_router.get("/dashboard/stats")
 async def get_dashboard_stats(current_user: UserInDB = Depends(get_current_user)):
-    # Get all progress
-    progress_docs = await topic_progress_collection.find(
-        {"user_id": current_user.id}
-    ).to_list(1000)
-    
-    # Get quiz attempts
-    quiz_attempts = await quiz_attempts_collection.find(
-        {"user_id": current_user.id}
-    ).to_list(1000)
-    
-    # Calculate stats
-    total_topics = len(progress_docs)
-    total_time = sum(p.get("time_spent", 0) for p in progress_docs)
-    total_quizzes = len(quiz_attempts)
-    avg_score = sum(q.get("score", 0) for q in quiz_attempts) / len(quiz_attempts) if quiz_attempts else 0
-    
-    # Subject-wise stats
-    subject_stats = {}
-    for progress in progress_docs:
-        subject = progress.get("subject")
-        if subject not in subject_stats:
-            subject_stats[subject] = {
-                "topics_studied": 0,
-                "time_spent": 0,
-                "average_mastery": 0
-            }
-        subject_stats[subject]["topics_studied"] += 1
-        subject_stats[subject]["time_spent"] += progress.get("time_spent", 0)
-        subject_stats[subject]["average_mastery"] += progress.get("mastery_level", 0)
-    
-    # Calculate averages
-    for subject in subject_stats:
-        count = subject_stats[subject]["topics_studied"]
-        if count > 0:
-            subject_stats[subject]["average_mastery"] /= count
-    
-    return {
-        "total_topics_studied": total_topics,
-        "total_time_spent": total_time,
-        "total_quizzes_completed": total_quizzes,
-        "average_quiz_score": round(avg_score, 2),
-        "subject_stats": subject_stats
-    }
+    stats = await get_user_stats(current_user.id)
+    return format_dashboard(stats)
 
 # ============= Content Metadata Routes =============
+def taxonomy_sources() -> list:
+    return [
+        (books_collection, {"approved": True}),
+        (videos_collection, {"approved": True}),
+        (quizzes_collection, {})
+    ]
+
+async def refresh_taxonomy():
+    """Periodically rebuild the taxonomy to pick up changes made through other workers"""
+    while True:
+        await asyncio.sleep(TAXONOMY_REFRESH_SECONDS)
+        try:
+            await taxonomy.rebuild(taxonomy_sources())
+        except Exception as e:
+            logger.error(f"Taxonomy refresh error: {str(e)}")
+
+def add_published_to_taxonomy(payload: dict):
+    """Newly visible content extends the metadata tree (and so its ETag)"""
+    for doc in payload["docs"]:
+        taxonomy.add(doc)
+
+events.subscribe(CONTENT_PUBLISHED, add_published_to_taxonomy)
+
+def conditional_json(payload: dict, if_none_match: Optional[str]) -> Response:
+    """JSON response with a content-derived ETag; 304 when the client already has it"""
+    body = json.dumps(payload, separators=(",", ":"), sort_keys=True)
+    etag = f'"{hashlib.sha1(body.encode()).hexdigest()[:20]}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @api_router.get("/metadata/subjects")
-async def get_subjects(stream: Optional[str] = None, class_level: Optional[int] = None):
+async def get_subjects(
+    stream: Optional[str] = None,
+    class_level: Optional[int] = None,
+    if_none_match: Optional[str] = Header(None)
+):
     """Get list of unique subjects"""
-    query = {"approved": True}
-    if stream:
-        query["stream"] = stream
-    if class_level:
-        query["class_level"] = class_level
-    
-    subjects = await books_collection.distinct("subject", query)
-    return {"subjects": sorted(subjects)}
+    return conditional_json({"subjects": taxonomy.subjects(stream, class_level)}, if_none_match)
 
 @api_router.get("/metadata/topics")
-async def get_topics(subject: str, stream: Optional[str] = None, class_level: Optional[int] = None):
+async def get_topics(
+    subject: str,
+    stream: Optional[str] = None,
+    class_level: Optional[int] = None,
+    if_none_match: Optional[str] = Header(None)
+):
     """Get list of topics for a subject"""
-    query = {"approved": True, "subject": subject}
+    return conditional_json({"topics": taxonomy.topics(subject, stream, class_level)}, if_none_match)
+
+# ============= Moderation Routes =============
+MODERATION_MAX_BATCH = int(os.getenv("MODERATION_MAX_BATCH", "1000"))
+
+# Matches the moderation_queue partial index; $in keeps the bounds point-exact so it can serve the sort
+PENDING_QUERY = {"approved": False, "rejected": {"$in": [False, None]}}
+
+MODERATED_CONTENT = {
+    "books": (books_collection, trusted_books),
+    "videos": (videos_collection, trusted_videos),
+}
+
+# Fields event subscribers need to update indexes and the taxonomy
+MODERATION_EVENT_PROJECTION = {"_id": 0, "id": 1, "stream": 1, "class_level": 1, "subject": 1, "topic": 1}
+
+def moderated_content(content_type: str):
+    if content_type not in MODERATED_CONTENT:
+        raise HTTPException(status_code=400, detail="content_type must be 'books' or 'videos'")
+    return MODERATED_CONTENT[content_type]
+
+@api_router.get("/moderation/queue/{content_type}", response_model=List[Union[Book, Video]])
+async def get_moderation_queue(
+    content_type: str,
+    response: Response,
+    stream: Optional[str] = None,
+    class_level: Optional[int] = None,
+    subject: Optional[str] = None,
+    uploaded_by: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """Pending books or videos, oldest uploads last, excluding rejected items"""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    collection, trusted = moderated_content(content_type)
+    query = dict(PENDING_QUERY)
     if stream:
         query["stream"] = stream
     if class_level:
         query["class_level"] = class_level
+    if subject:
+        query["subject"] = subject
+    if uploaded_by:
+        query["uploaded_by"] = uploaded_by
+    
+    items = await fetch_page(response, collection, query, CREATED_ORDER, limit, cursor, projection=trusted.projection())
+    return trusted.response(items, response)
+
+@api_router.post("/moderation/review")
+async def review_content(decision: ModerationDecision, current_user: UserInDB = Depends(get_current_user)):
+    """Approve or reject many pending items with a single update_many"""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    collection, _ = moderated_content(decision.content_type)
+    ids = list(dict.fromkeys(decision.ids))
+    if len(ids) > MODERATION_MAX_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MODERATION_MAX_BATCH} items per review")
+    
+    docs = await collection.find(
+        {**PENDING_QUERY, "id": {"$in": ids}}, MODERATION_EVENT_PROJECTION
+    ).to_list(len(ids))
+    if not docs:
+        return {"action": decision.action, "requested": len(ids), "modified": 0}
     
-    topics = await books_collection.distinct("topic", query)
-    return {"topics": sorted(topics)}
+    reviewed = {"reviewed_by": current_user.id, "reviewed_at": datetime.utcnow()}
+    if decision.action == ModerationAction.APPROVE:
+        update = {"$set": {"approved": True, "rejected": False, **reviewed}}
+    else:
+        update = {"$set": {"rejected": True, "rejection_reason": decision.reason, **reviewed}}
+    
+    result = await collection.update_many(
+        {**PENDING_QUERY, "id": {"$in": [doc["id"] for doc in docs]}}, update
+    )
+    
+    event = CONTENT_PUBLISHED if decision.action == ModerationAction.APPROVE else CONTENT_REJECTED
+    await events.publish(event, {"collection": decision.content_type, "docs": docs})
+    return {"action": decision.action, "requested": len(ids), "modified": result.modified_count}
+
+# ============= Admin Routes =============
+@api_router.get("/admin/cache/stats")
+async def get_cache_stats(current_user: UserInDB = Depends(get_current_user)):
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    return {
+        "principal_cache": principal_cache.stats(),
+        "llm_pool": llm_pool.stats(),
+        "answer_cache": answer_cache.stats(),
+        "search_index": {"books": books_index.stats(), "videos": videos_index.stats()},
+        "taxonomy": taxonomy.stats(),
+        "answer_keys": answer_keys.stats(),
+        "events": events.stats(),
+        "catalogue": catalogue_cache.stats()
+    }
+
+@api_router.get("/admin/db/stats")
+async def get_db_stats(current_user: UserInDB = Depends(get_current_user)):
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    return {"pool": pool_metrics.stats()}
+
+def require_profiling(current_user: UserInDB):
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if not profiling.PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled (set PROFILING_ENABLED=true)")
+
+@api_router.get("/admin/profile/stacks")
+async def profile_stacks(
+    seconds: float = Query(10, gt=0),
+    interval_ms: float = Query(10, ge=1, le=1000),
+    include_idle: bool = False,
+    format: str = Query("collapsed", pattern="^(collapsed|json)$"),
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """Sample every thread's stack; collapsed output feeds flamegraph.pl or speedscope"""
+    require_profiling(current_user)
+    try:
+        result = await profiling.sample_stacks(seconds, interval_ms / 1000, include_idle)
+    except profiling.ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    if format == "json":
+        return {"samples": result["samples"], "stacks": dict(result["stacks"].most_common())}
+    return PlainTextResponse(profiling.collapse(result["stacks"]))
+
+@api_router.get("/admin/profile/cpu")
+async def profile_cpu(
+    seconds: float = Query(5, gt=0),
+    limit: int = Query(50, ge=1, le=500),
+    sort: str = Query("cumulative", pattern="^(cumulative|tottime)$"),
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """cProfile the event loop thread for a few seconds"""
+    require_profiling(current_user)
+    try:
+        return {"functions": await profiling.profile_event_loop(seconds, limit, sort)}
+    except profiling.ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@api_router.get("/admin/profile/memory")
+async def profile_memory(
+    seconds: float = Query(10, gt=0),
+    limit: int = Query(25, ge=1, le=500),
+    frames: int = Query(1, ge=1, le=25),
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """Top allocation sites by memory growth while tracing"""
+    require_profiling(current_user)
+    try:
+        return await profiling.allocation_growth(seconds, limit, frames)
+    except profiling.ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@api_router.delete("/admin/answer-cache")
+async def invalidate_answer_cache(
+    subject: Optional[str] = None,
+    topic: Optional[str] = None,
+    current_user: UserInDB = Depends(get_current_user)
+):
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    return {"invalidated": answer_cache.invalidate(subject=subject, topic=topic)}
+
+# ============= Metrics =============
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+mongo_pool_gauge = registry.register(Gauge("mongo_pool", "MongoDB connection pool state", ("stat",)))
+llm_pool_gauge = registry.register(Gauge("llm_pool", "LLM client pool state", ("stat",)))
+
+def collect_pool_metrics():
+    pool = pool_metrics.stats()
+    for stat in ("open_connections", "checked_out", "waiting", "checkouts", "avg_wait_ms", "max_wait_ms"):
+        mongo_pool_gauge.set((stat,), pool[stat])
+    llm = llm_pool.stats()
+    for stat in ("in_flight", "waiting"):
+        llm_pool_gauge.set((stat,), llm[stat])
+
+registry.add_collector(collect_pool_metrics)
+
+@api_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(authorization: Optional[str] = Header(None)):
+    """Prometheus text exposition of request, dependency and pool metrics"""
+    if METRICS_TOKEN and authorization != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
 
 # ============= Root & Health Check =============
 @api_router.get("/")
@@ -534,15 +1201,38 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+# Compresses complete responses; 304s and streamed chat replies pass through
+app.add_middleware(CompressionMiddleware)
+
+# Outermost, so latency covers the whole middleware stack
+app.add_middleware(MetricsMiddleware)
+
 # Startup event
 @app.on_event("startup")
 async def startup_event():
+    await connect_db()
     await init_db()
     logger.info("Database initialized")
+    llm_pool.start()
+    await books_index.load(books_collection)
+    await videos_index.load(videos_collection)
+    logger.info(f"Search indexes built: {len(books_index)} books, {len(videos_index)} videos")
+    await taxonomy.rebuild(taxonomy_sources())
+    app.state.refresh_tasks = [
+        run_in_background(refresh_search_indexes()),
+        run_in_background(refresh_taxonomy())
+    ]
 
 # Shutdown event
 @app.on_event("shutdown")
 async def shutdown_event():
+    for task in app.state.refresh_tasks:
+        task.cancel()
+    shutdown_hash_pool()
+    await llm_pool.aclose()
+    await catalogue_cache.close()
+    close_db()
     logger.info("Shutting down...")
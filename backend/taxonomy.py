@@ -0,0 +1,74 @@
+from typing import Any, Dict, List, Optional, Set
+import os
+
+TAXONOMY_REFRESH_SECONDS = float(os.getenv("TAXONOMY_REFRESH_SECONDS", "300"))
+
+_GROUP_FIELDS = {"stream": "$stream", "class_level": "$class_level", "subject": "$subject", "topic": "$topic"}
+
+class Taxonomy:
+    """In-memory stream -> class_level -> subject -> topics tree of published content"""
+
+    def __init__(self):
+        self.tree: Dict[str, Dict[int, Dict[str, Set[str]]]] = {}
+        self.version = 0
+
+    def add(self, doc: Dict[str, Any]) -> bool:
+        """Add a content item's taxonomy path; returns True if the tree changed"""
+        stream, class_level = doc.get("stream"), doc.get("class_level")
+        subject, topic = doc.get("subject"), doc.get("topic")
+        if not (stream and class_level and subject):
+            return False
+        stream = getattr(stream, "value", stream)
+
+        subjects = self.tree.setdefault(stream, {}).setdefault(class_level, {})
+        changed = subject not in subjects
+        topics = subjects.setdefault(subject, set())
+        if topic and topic not in topics:
+            topics.add(topic)
+            changed = True
+        if changed:
+            self.version += 1
+        return changed
+
+    def _levels(self, stream: Optional[str], class_level: Optional[int]):
+        for stream_key, levels in self.tree.items():
+            if stream and stream_key != stream:
+                continue
+            for level, subjects in levels.items():
+                if class_level and level != class_level:
+                    continue
+                yield subjects
+
+    def subjects(self, stream: Optional[str] = None, class_level: Optional[int] = None) -> List[str]:
+        found = set()
+        for subjects in self._levels(stream, class_level):
+            found.update(subjects)
+        return sorted(found)
+
+    def topics(self, subject: str, stream: Optional[str] = None, class_level: Optional[int] = None) -> List[str]:
+        found = set()
+        for subjects in self._levels(stream, class_level):
+            found.update(subjects.get(subject, ()))
+        return sorted(found)
+
+    async def rebuild(self, sources: List[tuple]):
+        """Rebuild from (collection, query) pairs, grouping distinct paths server-side"""
+        tree = Taxonomy()
+        for collection, query in sources:
+            async for row in collection.aggregate([
+                {"$match": query},
+                {"$group": {"_id": _GROUP_FIELDS}}
+            ]):
+                tree.add(row["_id"])
+        if tree.tree != self.tree:
+            self.tree = tree.tree
+            self.version += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "streams": len(self.tree),
+            "subjects": len(self.subjects()),
+        }
+
+taxonomy = Taxonomy()
@@ -0,0 +1,177 @@
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+import asyncio
+import os
+import time
+from dotenv import load_dotenv
+
+import litellm
+import openai
+
+from cache import TTLCache
+from metrics import record_dependency, timed
+
+load_dotenv()
+
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai")
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-5.2")
+LLM_API_BASE = os.getenv("LLM_API_BASE")  # overrides the endpoint chosen from the key
+# Emergent keys (sk-emergent-...) are only accepted by the integration proxy, as in the frontend's chat route
+INTEGRATION_PROXY_URL = os.getenv("INTEGRATION_PROXY_URL", "https://integrations.emergentagent.com")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_CLIENT_POOL_SIZE = int(os.getenv("LLM_CLIENT_POOL_SIZE", "64"))
+LLM_CLIENT_IDLE_SECONDS = float(os.getenv("LLM_CLIENT_IDLE_SECONDS", "1800"))
+
+def build_system_message(context_type: Optional[str], subject: Optional[str]) -> str:
+    """Build the tutor system prompt for a chat context"""
+    if context_type == "summary":
+        return f"You are an expert AI tutor for {subject or 'various subjects'}. Provide clear, concise summaries of educational topics. Focus on key concepts and make them easy to understand for students."
+    elif context_type == "doubt":
+        return f"You are an AI tutor helping students with doubts and questions about {subject or 'their subjects'}. Provide detailed explanations with examples. Be patient, encouraging, and thorough."
+    return "You are a helpful AI tutor. Assist students with their learning needs."
+
+def resolve_api_base(api_key: Optional[str]) -> Optional[str]:
+    """Endpoint for the configured key; None means the provider's own API"""
+    if LLM_API_BASE:
+        return LLM_API_BASE
+    if api_key and api_key.startswith("sk-emergent-"):
+        return f"{INTEGRATION_PROXY_URL.rstrip('/')}/llm"
+    return None
+
+def create_http_client(api_key: Optional[str]) -> Optional[openai.AsyncOpenAI]:
+    """Keep-alive client shared by every transport; other providers use litellm's own client cache"""
+    if not api_key or LLM_PROVIDER != "openai":
+        return None
+    return openai.AsyncOpenAI(api_key=api_key, base_url=resolve_api_base(api_key))
+
+class LlmTransport:
+    """Completion calls for one model and tutor prompt; holds no conversation state"""
+
+    def __init__(self, api_key: Optional[str], model: str, system_message: str, client: Optional[openai.AsyncOpenAI] = None):
+        self.api_key = api_key
+        self.api_base = resolve_api_base(api_key)
+        self.model = model
+        self.system_message = system_message
+        self.client = client
+
+    def messages(self, prompt: Optional[str], text: str) -> List[Dict[str, str]]:
+        return [{"role": "system", "content": prompt or self.system_message}, {"role": "user", "content": text}]
+
+    async def complete(self, prompt: Optional[str], text: str) -> str:
+        response = await litellm.acompletion(
+            model=self.model, messages=self.messages(prompt, text), api_key=self.api_key, api_base=self.api_base,
+            client=self.client
+        )
+        return response.choices[0].message.content or ""
+
+    async def stream(self, prompt: Optional[str], text: str) -> AsyncIterator[str]:
+        """Yield reply tokens as the model generates them"""
+        response = await litellm.acompletion(
+            model=self.model, messages=self.messages(prompt, text), api_key=self.api_key, api_base=self.api_base,
+            client=self.client, stream=True
+        )
+        async for chunk in response:
+            token = chunk.choices[0].delta.content if chunk.choices else None
+            if token:
+                yield token
+
+class LlmClientPool:
+    """Reuses LLM transports across chat turns and caps concurrent upstream calls"""
+
+    def __init__(
+        self,
+        max_clients: int = LLM_CLIENT_POOL_SIZE,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        idle_seconds: float = LLM_CLIENT_IDLE_SECONDS,
+        transport_factory: Optional[Callable[[Optional[str], str, str], Any]] = None
+    ):
+        self.max_concurrency = max_concurrency
+        self.transport_factory = transport_factory
+        self.model = f"{LLM_PROVIDER}/{LLM_MODEL}"
+        self.api_key: Optional[str] = None
+        self.http_client: Optional[openai.AsyncOpenAI] = None
+        self.in_flight = 0
+        self.waiting = 0
+        self._clients = TTLCache(maxsize=max_clients, ttl=idle_seconds)
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def start(self):
+        """Read credentials once and set up the concurrency limit"""
+        self.api_key = os.getenv("EMERGENT_LLM_KEY")
+        self.http_client = create_http_client(self.api_key)
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._clients.clear()
+
+    def close(self):
+        self._clients.clear()
+
+    async def aclose(self):
+        """Drop pooled transports and close the shared HTTP client; start() opens a new one"""
+        self.close()
+        if self.http_client is not None:
+            await self.http_client.close()
+            self.http_client = None
+
+    def _create_transport(self, api_key: Optional[str], model: str, system_message: str) -> LlmTransport:
+        return LlmTransport(api_key, model, system_message, self.http_client)
+
+    def get_client(self, system_message: str):
+        """Return the pooled transport for the tutor prompt"""
+        if self._slots is None:
+            self.start()
+        # Per prompt rather than per session: each turn sends the stored summary and window, so no conversation state lives here
+        key = (self.model, system_message)
+        client = self._clients.get(key)
+        if client is None:
+            factory = self.transport_factory or self._create_transport
+            client = factory(self.api_key, self.model, system_message)
+            self._clients.set(key, client)
+        return client
+
+    async def _acquire(self):
+        self.waiting += 1
+        started = time.perf_counter()
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+            record_dependency("llm_queue", "acquire", time.perf_counter() - started)
+        self.in_flight += 1
+
+    def _release(self):
+        self.in_flight -= 1
+        self._slots.release()
+
+    async def send(self, system_message: str, prompt: Optional[str], text: str) -> str:
+        """Send text under prompt (the tutor prompt with the session's context) and return the full reply"""
+        client = self.get_client(system_message)
+        await self._acquire()
+        try:
+            with timed("llm", "send"):
+                return await client.complete(prompt, text)
+        finally:
+            self._release()
+
+    async def stream(self, system_message: str, prompt: Optional[str], text: str) -> AsyncIterator[str]:
+        """Stream a reply, holding a concurrency slot until the stream ends"""
+        client = self.get_client(system_message)
+        await self._acquire()
+        started = time.perf_counter()
+        failed = True
+        try:
+            async for chunk in client.stream(prompt, text):
+                yield chunk
+            failed = False
+        finally:
+            # Measured to the last chunk, so time spent by the consumer is included
+            record_dependency("llm", "stream", time.perf_counter() - started, failed)
+            self._release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "clients": self._clients.stats()
+        }
+
+llm_pool = LlmClientPool()
@@ -0,0 +1,126 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+
+from pymongo.errors import DuplicateKeyError
+from database import user_stats_collection, quiz_attempts_collection, topic_progress_collection
+
+# (subject, progress document before the update or None, attempts added, score added)
+ProgressChange = Tuple[str, Optional[Dict[str, Any]], int, float]
+
+def subject_key(subject: str) -> str:
+    """Field-name-safe key for a subject (names may contain '.' or start with '$')"""
+    return hashlib.sha1(subject.encode()).hexdigest()[:16]
+
+def empty_stats(user_id: str) -> Dict[str, Any]:
+    return {
+        "user_id": user_id,
+        "total_quizzes": 0,
+        "score_total": 0.0,
+        "total_topics": 0,
+        "total_time_spent": 0,
+        "subjects": {},
+        "updated_at": datetime.utcnow()
+    }
+
+def mastery_after(before: Optional[Dict[str, Any]], attempts: int, score_total: float) -> float:
+    """Mastery a topic ends up with once the attempts are applied (mirrors topic_progress_pipeline)"""
+    before = before or {}
+    old_attempts = before.get("quiz_attempts", 0)
+    old_total = before.get("score_total")
+    if old_total is None:
+        old_total = before.get("average_score", 0) * old_attempts
+    new_attempts = old_attempts + attempts
+    average = (old_total + score_total) / new_attempts if new_attempts else 0
+    return min(average, 100)
+
+def stats_increment(changes: List[ProgressChange]) -> Dict[str, Any]:
+    """Update document applying topic progress changes to the user's totals"""
+    inc: Dict[str, Any] = defaultdict(int)
+    names = {}
+    for subject, before, attempts, score_total in changes:
+        key = f"subjects.{subject_key(subject)}"
+        names[f"{key}.name"] = subject
+        inc["total_quizzes"] += attempts
+        inc["score_total"] += score_total
+        inc[f"{key}.mastery_total"] += mastery_after(before, attempts, score_total) - (before or {}).get("mastery_level", 0)
+        if before is None:
+            inc["total_topics"] += 1
+            inc[f"{key}.topics_studied"] += 1
+
+    return {
+        "$inc": dict(inc),
+        "$set": {**names, "updated_at": datetime.utcnow()}
+    }
+
+async def create_user_stats(user_id: str):
+    try:
+        await user_stats_collection.insert_one(empty_stats(user_id))
+    except DuplicateKeyError:
+        pass
+
+async def record_progress_changes(user_id: str, changes: List[ProgressChange]):
+    """Apply topic progress changes to the stats document (users without one are backfilled on read)"""
+    if changes:
+        await user_stats_collection.update_one({"user_id": user_id}, stats_increment(changes))
+
+async def rebuild_user_stats(user_id: str) -> Dict[str, Any]:
+    """Recompute a user's stats from quiz attempts and topic progress with $group"""
+    stats = empty_stats(user_id)
+
+    async for row in quiz_attempts_collection.aggregate([
+        {"$match": {"user_id": user_id}},
+        {"$group": {"_id": None, "count": {"$sum": 1}, "score_total": {"$sum": "$score"}}}
+    ]):
+        stats["total_quizzes"] = row["count"]
+        stats["score_total"] = row["score_total"]
+
+    async for row in topic_progress_collection.aggregate([
+        {"$match": {"user_id": user_id}},
+        {"$group": {
+            "_id": "$subject",
+            "topics_studied": {"$sum": 1},
+            "time_spent": {"$sum": "$time_spent"},
+            "mastery_total": {"$sum": "$mastery_level"}
+        }}
+    ]):
+        stats["total_topics"] += row["topics_studied"]
+        stats["total_time_spent"] += row["time_spent"]
+        stats["subjects"][subject_key(row["_id"])] = {
+            "name": row["_id"],
+            "topics_studied": row["topics_studied"],
+            "time_spent": row["time_spent"],
+            "mastery_total": row["mastery_total"]
+        }
+
+    await user_stats_collection.replace_one({"user_id": user_id}, stats, upsert=True)
+    return stats
+
+async def get_user_stats(user_id: str) -> Dict[str, Any]:
+    stats = await user_stats_collection.find_one({"user_id": user_id}, {"_id": 0})
+    if stats is None:
+        # Users from before stats were materialised are backfilled once
+        stats = await rebuild_user_stats(user_id)
+    return stats
+
+def format_dashboard(stats: Dict[str, Any]) -> Dict[str, Any]:
+    total_quizzes = stats.get("total_quizzes", 0)
+    avg_score = stats.get("score_total", 0) / total_quizzes if total_quizzes else 0
+
+    subject_stats = {}
+    for entry in stats.get("subjects", {}).values():
+        topics = entry.get("topics_studied", 0)
+        subject_stats[entry["name"]] = {
+            "topics_studied": topics,
+            "time_spent": entry.get("time_spent", 0),
+            "average_mastery": entry.get("mastery_total", 0) / topics if topics else 0
+        }
+
+    return {
+        "total_topics_studied": stats.get("total_topics", 0),
+        "total_time_spent": stats.get("total_time_spent", 0),
+        "total_quizzes_completed": total_quizzes,
+        "average_quiz_score": round(avg_score, 2),
+        "subject_stats": subject_stats
+    }
@@ -0,0 +1,56 @@
+import os
+import sys
+import uuid
+from pathlib import Path
+
+# Hermetic by default; CI also runs the suite with STORAGE_BACKEND=mongo against a real mongod
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import pytest
+from fastapi.testclient import TestClient
+
+@pytest.fixture(scope="session")
+def client():
+    import server
+
+    with TestClient(server.app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def login(client):
+    """Register a fresh user with the given role and return its auth headers"""
+    def _login(role: str = "student"):
+        email = f"{role}-{uuid.uuid4().hex[:8]}@example.com"
+        client.post("/api/auth/register", json={
+            "email": email, "password": "password", "full_name": "Test User", "role": role
+        })
+        response = client.post("/api/auth/login", json={"email": email, "password": "password"})
+        assert response.status_code == 200, response.text
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+    return _login
+
+@pytest.fixture
+def subject():
+    """A subject name no other test uses, so listings filtered by it are isolated"""
+    return f"Subject {uuid.uuid4().hex[:8]}"
+
+@pytest.fixture
+def book_payload(subject):
+    return {"title": "Optics", "author": "A", "stream": "CBSE", "class_level": 10, "subject": subject, "topic": "Light"}
+
+@pytest.fixture
+def video_payload(subject):
+    return {
+        "title": "Optics", "teacher_name": "T", "stream": "CBSE", "class_level": 10, "subject": subject,
+        "topic": "Light", "difficulty": "beginner"
+    }
+
+@pytest.fixture
+def quiz_payload(subject):
+    return {
+        "title": "Optics", "stream": "CBSE", "class_level": 10, "subject": subject, "topic": "Light",
+        "difficulty": "beginner",
+        "questions": [{"question": "?", "options": ["a", "b", "c", "d"], "correct_answer": 1, "explanation": "e"}]
+    }
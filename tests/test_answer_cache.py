@@ -0,0 +1,30 @@
+import pytest
+
+from answer_cache import AnswerCache
+
+@pytest.fixture
+def cache():
+    cache = AnswerCache(maxsize=100, ttl=60, similarity=0.85, context_types={"summary"})
+    cache.store("Why does ice float on water?", "Physics", "Density", "summary", "Ice is less dense.")
+    return cache
+
+def lookup(cache, message):
+    return cache.lookup(message, "Physics", "Density", "summary")
+
+def test_rephrasings_with_the_same_content_words_hit(cache):
+    assert lookup(cache, "why does ice float on water") == "Ice is less dense."
+    assert lookup(cache, "Why does the ice float on the water??") == "Ice is less dense."
+    assert cache.stats()["similar_hits"] == 1
+
+@pytest.mark.parametrize("message", [
+    "Why does ice not float on water?",
+    "Why doesn't ice float on water?",
+    "Why does ice never float on water?",
+    "Why does ice float on hot water?",
+])
+def test_questions_with_other_content_words_miss(cache, message):
+    assert lookup(cache, message) is None
+
+def test_invalidated_entries_stop_matching(cache):
+    assert cache.invalidate("Physics") == 1
+    assert lookup(cache, "Why does the ice float on the water?") is None
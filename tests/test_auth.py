@@ -0,0 +1,10 @@
+import asyncio
+
+from auth import get_password_hash_async, shutdown_hash_pool, verify_password_async
+
+def test_hash_pool_restarts_after_shutdown():
+    # Each app lifespan shuts the pool down; a later one (new event loop) must still hash
+    for _ in range(2):
+        hashed = asyncio.run(get_password_hash_async("password"))
+        assert asyncio.run(verify_password_async("password", hashed)) == (True, None)
+        shutdown_hash_pool()
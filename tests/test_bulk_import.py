@@ -0,0 +1,28 @@
+import itertools
+import json
+
+import pytest
+
+from bulk_import import MalformedPayload, _JsonArrayParser
+
+def feed_in_pieces(payload: bytes, sizes):
+    parser = _JsonArrayParser()
+    records, offset = [], 0
+    for size in itertools.cycle(sizes):
+        if offset >= len(payload):
+            break
+        records.extend(parser.feed(payload[offset:offset + size]))
+        offset += size
+    return records + parser.feed(b"", eof=True)
+
+@pytest.mark.parametrize("sizes", [[1], [2], [3], [1, 3, 2]])
+def test_elements_split_across_chunks(sizes):
+    values = [1.5e3, -0.25, 12, 7e-3, True, None, "café", {"a": [1, 2.5]}, []]
+    payload = json.dumps(values).encode()
+    assert feed_in_pieces(payload, sizes) == values
+    assert feed_in_pieces(b"[1.5e3]", sizes) == [1.5e3]
+
+def test_malformed_payloads_are_rejected():
+    for payload in (b"[1.5e3", b"[1 2]", b"[1.]", b"{}"):
+        with pytest.raises(MalformedPayload):
+            feed_in_pieces(payload, [1])
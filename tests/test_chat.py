@@ -0,0 +1,107 @@
+import json
+import uuid
+from datetime import datetime
+
+import pytest
+
+import tutor_llm
+from tutor_llm import llm_pool, resolve_api_base
+
+class FakeTransport:
+    def __init__(self, tokens=(), error=None):
+        self.tokens = list(tokens)
+        self.error = error
+        self.calls = []
+
+    async def complete(self, prompt, text):
+        return "".join([token async for token in self.stream(prompt, text)])
+
+    async def stream(self, prompt, text):
+        self.calls.append((prompt, text))
+        if self.error:
+            raise self.error
+        for token in self.tokens:
+            yield token
+
+@pytest.fixture
+def use_transport(monkeypatch):
+    def _use(transport):
+        monkeypatch.setattr(llm_pool, "transport_factory", lambda api_key, model, system_message: transport)
+        llm_pool.close()
+        return transport
+    yield _use
+    llm_pool.close()
+
+def sse_events(body: str):
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        yield lines.get("event", "message"), json.loads(lines["data"])
+
+def get_messages(client, headers, session_id):
+    session = client.get(f"/api/chat/sessions/{session_id}", headers=headers).json()
+    return [(message["role"], message["content"]) for message in session["messages"]]
+
+def test_stream_forwards_tokens_as_generated(client, login, use_transport):
+    transport = use_transport(FakeTransport(["Light ", "bends ", "in glass."]))
+    student = login("student")
+    question = f"Why does light bend {uuid.uuid4().hex}?"
+    response = client.post("/api/chat/stream", json={"message": question}, headers=student)
+    events = list(sse_events(response.text))
+
+    assert [data["token"] for event, data in events if event == "message"] == ["Light ", "bends ", "in glass."]
+    session_id = events[0][1]["session_id"]
+    assert events[-1] == ("done", {"session_id": session_id})
+    assert get_messages(client, student, session_id) == [("user", question), ("assistant", "Light bends in glass.")]
+    # Earlier turns reach the prompt from storage, the current question only as the user message
+    assert question not in transport.calls[0][0]
+
+def test_stream_keeps_question_when_generation_fails(client, login, use_transport):
+    use_transport(FakeTransport(error=RuntimeError("upstream unavailable")))
+    student = login("student")
+    question = f"What is refraction {uuid.uuid4().hex}?"
+    response = client.post("/api/chat/stream", json={"message": question}, headers=student)
+    events = list(sse_events(response.text))
+
+    assert events[-1][0] == "error"
+    assert get_messages(client, student, events[0][1]["session_id"]) == [("user", question)]
+
+def test_every_turn_prompt_comes_from_stored_history(client, login, use_transport):
+    transport = use_transport(FakeTransport(["Answer."]))
+    student = login("student")
+    session_id = client.post("/api/chat", json={"message": "First question"}, headers=student).json()["session_id"]
+    client.post("/api/chat", json={"message": "Second question", "session_id": session_id}, headers=student)
+
+    # The second turn sees the first exchange exactly as stored, and the transport is shared
+    prompt, text = transport.calls[1]
+    assert text == "Second question"
+    assert "Student: First question\nTutor: Answer." in prompt
+    assert llm_pool.stats()["clients"]["size"] == 1
+
+def test_emergent_keys_go_through_the_integration_proxy(monkeypatch):
+    monkeypatch.setattr(tutor_llm, "LLM_API_BASE", None)
+    assert resolve_api_base("sk-emergent-abc") == f"{tutor_llm.INTEGRATION_PROXY_URL}/llm"
+    assert resolve_api_base("sk-proj-abc") is None
+    monkeypatch.setattr(tutor_llm, "LLM_API_BASE", "http://proxy.local/v1")
+    assert resolve_api_base("sk-emergent-abc") == "http://proxy.local/v1"
+
+def test_message_count_backfilled_for_sessions_stored_without_it(client, login, use_transport):
+    from database import chat_sessions_collection
+
+    use_transport(FakeTransport(["Answer."]))
+    student = login("student")
+    user_id = client.get("/api/auth/me", headers=student).json()["id"]
+    session_id = str(uuid.uuid4())
+    old_messages = [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"Turn {i}", "timestamp": datetime.utcnow()}
+        for i in range(60)
+    ]
+    client.portal.call(chat_sessions_collection.insert_one, {
+        "id": session_id, "user_id": user_id, "messages": old_messages,
+        "created_at": datetime.utcnow(), "updated_at": datetime.utcnow()
+    })
+    headers = client.get("/api/chat/sessions", headers=student).json()
+    assert [header["message_count"] for header in headers if header["id"] == session_id] == [60]
+
+    client.post("/api/chat", json={"message": "Next question", "session_id": session_id}, headers=student)
+    stored = client.portal.call(chat_sessions_collection.find_one, {"id": session_id})
+    assert stored["message_count"] == 62
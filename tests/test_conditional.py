@@ -0,0 +1,26 @@
+from conditional import etag_matches
+
+def test_etag_matches_uses_weak_comparison():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc"', '"abc"')
+    assert etag_matches('"abc"', 'W/"abc"')
+    assert etag_matches('"x", W/"abc" ,"y"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"abcd", W/"ab"', '"abc"')
+    assert not etag_matches(None, '"abc"')
+    assert not etag_matches("", '"abc"')
+
+def test_weakened_compressed_etag_revalidates(client, login, subject, book_payload):
+    client.post("/api/books", json={**book_payload, "summary": "Light " * 500}, headers=login("admin"))
+    path = f"/api/books?subject={subject.replace(' ', '+')}"
+    headers = {"Accept-Encoding": "gzip"}
+    response = client.get(path, headers=headers)
+    etag = response.headers["ETag"]
+    assert etag.endswith('-gzip"')
+
+    # A proxy that re-encodes the body weakens the tag it forwards
+    revalidated = client.get(path, headers={**headers, "If-None-Match": f"W/{etag}"})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == f"W/{etag}"
+    metrics = client.get("/api/metrics").text
+    assert 'http_requests_total{method="GET",route="/api/books",status="304"}' in metrics
@@ -0,0 +1,87 @@
+from models import Book, Video, Quiz, QuizSummary
+import server
+
+def test_listing_keys_match_model_fields(client, login, subject, book_payload, video_payload, quiz_payload):
+    admin, teacher = login("admin"), login("teacher")
+    # Approved through moderation, so the stored documents carry reviewed_by/reviewed_at
+    for path, payload in [("/api/books", book_payload), ("/api/videos", video_payload)]:
+        created = client.post(path, json=payload, headers=teacher).json()
+        response = client.post("/api/moderation/review", headers=admin, json={
+            "content_type": path.rsplit("/", 1)[1], "ids": [created["id"]], "action": "approve"
+        })
+        assert response.json()["modified"] == 1
+    client.post("/api/quizzes", json=quiz_payload, headers=admin)
+
+    for path, model in [
+        ("/api/books", Book), ("/api/books?compact=true", Book),
+        ("/api/videos", Video), ("/api/videos?compact=true", Video),
+        ("/api/quizzes", Quiz), ("/api/quizzes?compact=true", QuizSummary),
+    ]:
+        separator = "&" if "?" in path else "?"
+        items = client.get(f"{path}{separator}subject={subject.replace(' ', '+')}").json()
+        assert len(items) == 1, path
+        assert set(items[0]) == set(model.model_fields), path
+
+def test_moderation_queue_keys_match_model_fields(client, login, subject, book_payload):
+    admin, teacher = login("admin"), login("teacher")
+    client.post("/api/books", json=book_payload, headers=teacher)
+    items = client.get(f"/api/moderation/queue/books?subject={subject.replace(' ', '+')}", headers=admin).json()
+    assert len(items) == 1
+    assert set(items[0]) == set(Book.model_fields)
+
+def search_books(client, subject, word, etag=None):
+    headers = {"If-None-Match": etag} if etag else {}
+    return client.get(f"/api/books?subject={subject.replace(' ', '+')}&search={word}", headers=headers)
+
+def test_search_listing_follows_index_generation(client, login, subject, book_payload):
+    admin = login("admin")
+    word = subject.split()[1]
+    book = client.post("/api/books", json={**book_payload, "title": f"Optics {word}"}, headers=admin).json()
+    # Another worker published the book; this worker's index has not refreshed yet
+    server.books_index.remove(book["id"])
+    stale = search_books(client, subject, word)
+    assert stale.json() == []
+    assert search_books(client, subject, word, stale.headers["ETag"]).status_code == 304
+
+    server.books_index.add({**book, "created_at": None})
+    fresh = search_books(client, subject, word, stale.headers["ETag"])
+    assert fresh.status_code == 200
+    assert [item["id"] for item in fresh.json()] == [book["id"]]
+
+def test_failed_scope_bump_invalidates_whole_collection(client, login, book_payload, monkeypatch):
+    admin = login("admin")
+    etag = client.get("/api/books").headers["ETag"]
+    scope_bump = server.content_versions.bump
+
+    async def failing_bump(name, docs=None):
+        if docs is not None:
+            raise RuntimeError("content_versions unavailable")
+        await scope_bump(name, docs)
+
+    monkeypatch.setattr(server.content_versions, "bump", failing_bump)
+    client.post("/api/books", json=book_payload, headers=admin)
+    response = client.get("/api/books", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+def test_search_filters_apply_before_candidate_limit(client, login, subject, book_payload, monkeypatch):
+    monkeypatch.setattr(server, "SEARCH_CANDIDATE_LIMIT", 2)
+    admin, teacher = login("admin"), login("teacher")
+    word = subject.split()[1]
+    # Better-ranked matches in other subjects, and unapproved ones in this subject, must not crowd out the rest
+    for i in range(3):
+        client.post("/api/books", json={**book_payload, "subject": f"Other {word}", "title": f"{word} {word}"}, headers=admin)
+        client.post("/api/books", json={**book_payload, "title": f"{word} {word} pending"}, headers=teacher)
+    expected = {
+        client.post("/api/books", json={**book_payload, "title": f"{word} approved {i}"}, headers=admin).json()["id"]
+        for i in range(3)
+    }
+
+    first = search_books(client, subject, word)
+    page = client.get(f"/api/books?subject={subject.replace(' ', '+')}&search={word}&limit=2")
+    rest = client.get(
+        f"/api/books?subject={subject.replace(' ', '+')}&search={word}&limit=2&cursor={page.headers['X-Next-Cursor']}"
+    )
+    assert {item["id"] for item in first.json()} == expected
+    assert {item["id"] for item in page.json() + rest.json()} == expected
+    assert "X-Next-Cursor" not in rest.headers
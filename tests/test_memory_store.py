@@ -0,0 +1,152 @@
+import asyncio
+import re
+from datetime import datetime, timedelta
+
+import pytest
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from indexes import apply_indexes, check_query_plans
+from memory_store import MemoryClient
+
+def run(coro):
+    return asyncio.run(coro)
+
+@pytest.fixture
+def db():
+    return MemoryClient()["test"]
+
+BOOKS = [
+    {"id": "a", "title": "Optics", "class_level": 10, "subject": "Physics", "tags": ["light", "lens"], "approved": True},
+    {"id": "b", "title": "Acids", "class_level": 9, "subject": "Chemistry", "tags": [], "approved": False},
+    {"id": "c", "title": "Motion", "class_level": 11, "subject": "Physics", "approved": True, "rejected": None},
+]
+
+@pytest.mark.parametrize("query, expected", [
+    ({"subject": "Physics"}, ["a", "c"]),
+    ({"tags": "lens"}, ["a"]),
+    ({"id": {"$in": ["c", "a", "z"]}}, ["a", "c"]),
+    ({"id": {"$nin": ["a"]}}, ["b", "c"]),
+    ({"subject": {"$ne": "Physics"}}, ["b"]),
+    ({"class_level": {"$gt": 9, "$lte": 11}}, ["a", "c"]),
+    ({"class_level": {"$gte": 10, "$lt": 11}}, ["a"]),
+    ({"rejected": {"$in": [False, None]}}, ["a", "b", "c"]),
+    ({"rejected": {"$exists": True}}, ["c"]),
+    ({"title": {"$regex": "^o", "$options": "i"}}, ["a"]),
+    ({"title": re.compile("tion$")}, ["c"]),
+    ({"title": {"$not": re.compile("^A")}}, ["a", "c"]),
+    ({"tags": {"$size": 0}}, ["b"]),
+    ({"tags": {"$all": ["lens", "light"]}}, ["a"]),
+    ({"$or": [{"class_level": 9}, {"title": "Motion"}]}, ["b", "c"]),
+    ({"$and": [{"approved": True}, {"class_level": {"$lt": 11}}]}, ["a"]),
+    ({"$nor": [{"approved": True}]}, ["b"]),
+    ({"$expr": {"$gt": ["$class_level", 10]}}, ["c"]),
+])
+def test_query_operators(db, query, expected):
+    run(db.books.insert_many([dict(book) for book in BOOKS]))
+    assert [doc["id"] for doc in run(db.books.find(query).to_list(None))] == expected
+
+def test_sort_limit_and_projection(db):
+    run(db.books.insert_many([dict(book) for book in BOOKS]))
+    docs = run(db.books.find({}, {"_id": 0, "id": 1, "tag_count": {"$size": {"$ifNull": ["$tags", []]}}})
+               .sort([("class_level", -1)]).limit(2).to_list(None))
+    assert docs == [{"id": "c", "tag_count": 0}, {"id": "a", "tag_count": 2}]
+
+def test_operator_updates_and_upsert(db):
+    run(db.sessions.update_one(
+        {"id": "s"},
+        {"$push": {"messages": {"$each": [1, 2]}}, "$inc": {"count": 2}, "$setOnInsert": {"created": 1}},
+        upsert=True
+    ))
+    run(db.sessions.update_one(
+        {"id": "s"},
+        {"$push": {"messages": {"$each": [3]}}, "$inc": {"count": 1}, "$setOnInsert": {"created": 2},
+         "$set": {"meta.subject": "Physics"}, "$addToSet": {"tags": "x"}}
+    ))
+    doc = run(db.sessions.find_one({"id": "s"}, {"_id": 0, "messages": {"$slice": -2}}))
+    assert doc == {"id": "s", "messages": [2, 3], "count": 3, "created": 1, "meta": {"subject": "Physics"}, "tags": ["x"]}
+    run(db.sessions.update_one({"id": "s"}, {"$unset": {"meta": ""}}))
+    assert "meta" not in run(db.sessions.find_one({"id": "s"}))
+
+def test_pipeline_update_with_find_one_and_update(db):
+    pipeline = [
+        {"$set": {
+            "score_total": {"$add": [{"$ifNull": ["$score_total", 0]}, 80]},
+            "attempts": {"$add": [{"$ifNull": ["$attempts", 0]}, 1]}
+        }},
+        {"$set": {"average": {"$cond": [{"$gt": ["$attempts", 0]}, {"$divide": ["$score_total", "$attempts"]}, 0]}}},
+        {"$set": {"mastery": {"$min": ["$average", 100]}}},
+    ]
+    before = run(db.progress.find_one_and_update(
+        {"user_id": "u", "topic": "t"}, pipeline, upsert=True, return_document=ReturnDocument.BEFORE
+    ))
+    after = run(db.progress.find_one_and_update(
+        {"user_id": "u", "topic": "t"}, pipeline, projection={"_id": 0}, return_document=ReturnDocument.AFTER
+    ))
+    assert before is None
+    assert after == {"user_id": "u", "topic": "t", "score_total": 160, "attempts": 2, "average": 80, "mastery": 80}
+
+def test_unique_indexes_and_bulk_write(db):
+    run(db.progress.create_index([("user_id", 1), ("topic", 1)], unique=True))
+    run(db.progress.insert_one({"user_id": "u", "topic": "t"}))
+    with pytest.raises(DuplicateKeyError):
+        run(db.progress.insert_one({"user_id": "u", "topic": "t"}))
+    with pytest.raises(BulkWriteError) as error:
+        run(db.progress.insert_many([{"user_id": "u", "topic": "x"}, {"user_id": "u", "topic": "t"}], ordered=False))
+    assert [e["code"] for e in error.value.details["writeErrors"]] == [11000]
+
+    result = run(db.progress.bulk_write([
+        UpdateOne({"user_id": "u", "topic": "t"}, {"$inc": {"n": 1}}),
+        UpdateOne({"user_id": "u", "topic": "y"}, {"$inc": {"n": 1}}, upsert=True),
+    ]))
+    assert (result.modified_count, result.upserted_count) == (1, 1)
+    assert run(db.progress.count_documents({"user_id": "u"})) == 3
+
+def test_aggregate_group(db):
+    now = datetime(2026, 1, 1)
+    run(db.attempts.insert_many([
+        {"user_id": "u", "score": score, "completed_at": now + timedelta(minutes=i)} for i, score in enumerate([50, 100])
+    ]))
+    rows = run(db.attempts.aggregate([
+        {"$match": {"user_id": "u"}},
+        {"$group": {"_id": "$user_id", "count": {"$sum": 1}, "total": {"$sum": "$score"}, "avg": {"$avg": "$score"},
+                    "last": {"$max": "$completed_at"}}},
+    ]).to_list(None))
+    assert rows == [{"_id": "u", "count": 2, "total": 150, "avg": 75.0, "last": now + timedelta(minutes=1)}]
+
+def test_registered_query_shapes_use_indexes(db):
+    run(apply_indexes(db))
+    assert run(check_query_plans(db)) == []
+
+def test_apply_indexes_replaces_baseline_topic_progress_index(db):
+    run(db.topic_progress.create_index([("user_id", 1), ("subject", 1), ("topic", 1)]))
+    run(apply_indexes(db))
+    indexes = run(db.topic_progress.index_information())
+    assert "user_id_1_subject_1_topic_1" not in indexes
+    assert indexes["user_topic_unique"]["unique"] is True
+
+def test_explain_reports_sort_and_scan(db):
+    run(apply_indexes(db))
+    quiz_listing = run(db.quizzes.find({}).sort([("created_at", -1), ("id", -1)]).explain())["queryPlanner"]["winningPlan"]
+    assert quiz_listing == {"stage": "FETCH", "inputStage": {
+        "stage": "IXSCAN", "indexName": "created_at_-1_id_-1", "keyPattern": {"created_at": -1, "id": -1}
+    }}
+    unindexed = run(db.quizzes.find({"title": "x"}).sort([("title", 1)]).explain())["queryPlanner"]["winningPlan"]
+    assert unindexed == {"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}}
+
+def test_check_flags_plans_examining_many_documents(db):
+    run(apply_indexes(db))
+    now = datetime(2026, 1, 1)
+    # Recent books are all Chemistry; the Physics page sits behind them in created_at order
+    run(db.books.insert_many([
+        {"id": f"b{i}", "approved": True, "subject": "Physics" if i < 5 else "Chemistry",
+         "created_at": now + timedelta(minutes=i)}
+        for i in range(200)
+    ]))
+    assert run(check_query_plans(db)) == []
+
+    run(db.books.drop_index("approved_1_subject_1_created_at_-1_id_-1"))
+    assert run(check_query_plans(db)) == ["book listing by subject only"]
+    stats = run(db.books.find({"approved": True, "subject": "Physics"}).sort([("created_at", -1)]).limit(100).explain())
+    assert stats["executionStats"]["nReturned"] == 5
+    assert stats["executionStats"]["totalDocsExamined"] == 200
@@ -0,0 +1,56 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import user_stats
+
+def create_quizzes(client, login, quiz_payload, topics):
+    admin = login("admin")
+    return [
+        client.post("/api/quizzes", json={**quiz_payload, "topic": topic}, headers=admin).json()["id"]
+        for topic in topics
+    ]
+
+def test_concurrent_batches_keep_stats_consistent(client, login, subject, quiz_payload):
+    quiz_ids = create_quizzes(client, login, quiz_payload, ["Light", "Sound"])
+    student = login("student")
+    batch = {"attempts": [{"quiz_id": quiz_id, "answers": [answer]} for quiz_id in quiz_ids for answer in (0, 1)]}
+
+    with ThreadPoolExecutor(8) as pool:
+        responses = list(pool.map(
+            lambda _: client.post("/api/quizzes/attempts/batch", json=batch, headers=student), range(8)
+        ))
+    assert all(response.json()["graded"] == 4 for response in responses)
+
+    dashboard = client.get("/api/dashboard/stats", headers=student).json()
+    user_id = client.get("/api/auth/me", headers=student).json()["id"]
+    rebuilt = user_stats.format_dashboard(client.portal.call(user_stats.rebuild_user_stats, user_id))
+    assert dashboard == rebuilt
+    assert dashboard["total_quizzes_completed"] == 32
+    assert dashboard["subject_stats"][subject] == {"topics_studied": 2, "time_spent": 0, "average_mastery": 50.0}
+
+def test_concurrent_attempts_all_count(client, login, subject, quiz_payload):
+    quiz_id, = create_quizzes(client, login, quiz_payload, ["Light"])
+    student = login("student")
+    answers = [1, 0] * 10
+
+    with ThreadPoolExecutor(8) as pool:
+        responses = list(pool.map(
+            lambda answer: client.post(f"/api/quizzes/{quiz_id}/attempt", json=[answer], headers=student), answers
+        ))
+    assert all(response.status_code == 200 for response in responses)
+
+    progress, = client.get(f"/api/progress/{subject}", headers=student).json()
+    assert progress["quiz_attempts"] == len(answers)
+    assert progress["average_score"] == progress["mastery_level"] == 50.0
+    dashboard = client.get("/api/dashboard/stats", headers=student).json()
+    assert dashboard["total_quizzes_completed"] == len(answers)
+    assert dashboard["subject_stats"][subject]["average_mastery"] == 50.0
+
+def test_out_of_range_answers_are_rejected(client, login, quiz_payload):
+    quiz_id, = create_quizzes(client, login, quiz_payload, ["Light"])
+    student = login("student")
+
+    for answers in ([2 ** 70], [-2], [128]):
+        assert client.post(f"/api/quizzes/{quiz_id}/attempt", json=answers, headers=student).status_code == 422
+        batch = {"attempts": [{"quiz_id": quiz_id, "answers": answers}]}
+        assert client.post("/api/quizzes/attempts/batch", json=batch, headers=student).status_code == 422
+    assert client.post(f"/api/quizzes/{quiz_id}/attempt", json=[-1], headers=student).json()["score"] == 0